@@ -0,0 +1,425 @@
+"""
+File with the data layer of the RAWG dashboard - every mart is read into a typed Polars
+DataFrame, with the month strings already parsed, so the widgets of the page reuse the
+same frames on every rerun.
+
+The marts are read from the Parquet snapshots exported after each dbt build (see
+src/utils/mart_snapshots.py), a snapshot is downloaded again only when the manifest
+points to a new file. Without a snapshot the mart is read from the database.
+
+The caches are keyed on the version of the marts (the manifest version, or the id of
+the dbt build in mart_rawg__build), so the data is only reloaded after a new build.
+"""
+
+import time
+import datetime
+import threading
+import polars as pl
+import streamlit as st
+
+from supabase import create_client, Client
+from src.utils.mart_snapshots import read_manifest, read_snapshot
+from src.utils.supabase_readers import Filter, read_max_value, read_table
+from src.utils.logger import setup_logger
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+# region ------------ Mart schemas ------------
+MARTS_SCHEMA: str = "public_marts"
+
+# Seconds between checks of the marts version, one tiny request
+VERSION_CHECK_SECONDS: int = 60
+
+WARM_UP_THREAD_NAME: str = "marts-cache-warm-up"
+
+# Tags ranked in each month shown by the page (the chart of the top tags)
+TOP_TAGS_RANK: int = 5
+
+# PostgREST operators of the filters and their Polars comparison, for the snapshots
+FILTER_OPERATORS: dict[str, str] = {
+    "eq": "eq",
+    "neq": "ne",
+    "lt": "lt",
+    "lte": "le",
+    "gt": "gt",
+    "gte": "ge",
+}
+
+MART_RAWG__KPIS_SCHEMA: dict[str, pl.DataType] = {
+    "kpi_id": pl.Int64,
+    "total_game_releases": pl.Int64,
+    "most_released_tag": pl.Utf8,
+    "period_most_releases": pl.Utf8,
+    "period_least_releases": pl.Utf8,
+    "last_updated_at": pl.Utf8,
+}
+
+# Only the columns used by the page are selected, the schemas are the projections
+MART_RAWG__RELEASES_BY_GAMES_MONTHYEAR_SCHEMA: dict[str, pl.DataType] = {
+    "game_count": pl.Int64,
+    "month_year": pl.Utf8,
+}
+
+MART_RAWG__RELEASES_BY_GAMES_PLATFORM_SCHEMA: dict[str, pl.DataType] = {
+    "platform_name": pl.Utf8,
+    "parent_platform_name": pl.Utf8,
+    "platform_releases_count": pl.Int64,
+    "month_year": pl.Utf8,
+    "rank": pl.Int64,
+    "rank_category": pl.Utf8,
+    "row_id": pl.Int64,
+}
+
+MART_RAWG__RELEASES_BY_GAMETAGS_MONTHYEAR_SCHEMA: dict[str, pl.DataType] = {
+    "game_tag": pl.Utf8,
+    "tag_count": pl.Int64,
+    "month_year": pl.Utf8,
+    "rank": pl.Int64,
+    "rank_category": pl.Utf8,
+    "row_id": pl.Int64,
+}
+# endregion
+
+
+# region ------------ Supabase connection ------------
+@st.cache_resource
+def init_connection() -> Client:
+    url = st.secrets["SUPABASE_URL"]
+    key = st.secrets["SUPABASE_KEY"]
+    return create_client(url, key)
+
+
+# endregion
+
+
+# region ------------ Read marts ------------
+def _snapshots_bucket() -> str | None:
+    """
+    The bucket of the snapshots, from MART_SNAPSHOTS_BUCKET in the secrets. Without
+    it the snapshots are read from data_local/snapshots/marts, for local runs.
+    """
+    return st.secrets.get("MART_SNAPSHOTS_BUCKET")
+
+
+@st.cache_data(ttl=VERSION_CHECK_SECONDS, show_spinner=False)
+def get_snapshot_manifest() -> dict | None:
+    """
+    Function to get the manifest of the marts snapshots, a small JSON file checked
+    every VERSION_CHECK_SECONDS so a new dbt build is picked up quickly.
+
+    Returns:
+        dict | None: The manifest, None if there is no snapshot
+    """
+    return read_manifest(client=init_connection(), bucket=_snapshots_bucket())
+
+
+@st.cache_data(max_entries=20)
+def _read_mart_snapshot(file: str, etag: str) -> pl.DataFrame:
+    # Cached by file and etag, the same snapshot is never downloaded twice
+    return read_snapshot(file, client=init_connection(), bucket=_snapshots_bucket())
+
+
+@st.cache_data(ttl=VERSION_CHECK_SECONDS, show_spinner=False)
+def _read_build_id() -> str | None:
+    # Id of the last dbt build, for the marts read from the database
+    try:
+        return read_max_value(
+            client=init_connection(),
+            table_name="mart_rawg__build",
+            column="build_id",
+            schema_name=MARTS_SCHEMA,
+        )
+    except Exception as e:
+        logger.warning("Could not read the build id of the marts: %s", e)
+        return None
+
+
+def get_marts_version() -> str:
+    """
+    Function to get the version of the marts, the key of the caches of the loaders:
+    the version of the snapshots manifest, or the id of the last dbt build when there
+    is no snapshot. Without both, the current hour, i.e. the marts are reloaded every
+    hour.
+
+    Returns:
+        str: The version
+    """
+    manifest: dict | None = get_snapshot_manifest()
+
+    if manifest is not None:
+        return manifest["version"]
+
+    return _read_build_id() or f"hour-{int(time.time() // 3600)}"
+
+
+@st.cache_data(max_entries=20)
+def _read_mart_table(
+    table_name: str,
+    key: str,
+    version: str,
+    _schema: dict,
+    filters: list[Filter] | None = None,
+) -> pl.DataFrame:
+    # The schema is not hashed (leading underscore), it depends on the table name
+    return read_table(
+        client=init_connection(),
+        table_name=table_name,
+        key=key,
+        columns=list(_schema),
+        schema_name=MARTS_SCHEMA,
+        schema=_schema,
+        filters=filters,
+    )
+
+
+def _filters_expr(filters: list[Filter]) -> pl.Expr:
+    # The PostgREST filters as one Polars predicate, applied to the snapshots
+    return pl.all_horizontal(
+        getattr(pl.col(column), FILTER_OPERATORS[operator])(value)
+        for column, operator, value in filters
+    )
+
+
+def read_mart(
+    table_name: str,
+    key: str,
+    schema: dict[str, pl.DataType],
+    version: str,
+    filters: list[Filter] | None = None,
+) -> pl.DataFrame:
+    """
+    Reads the columns of the schema of a mart, from its snapshot if the manifest lists
+    one, else from the database.
+
+    Args:
+        table_name (str): The name of the mart.
+        key (str): The unique column of the mart, to page the database reads.
+        schema (dict): The columns to read and their types.
+        version (str): The version of the marts, keys the database reads.
+        filters (list[Filter], optional): Row filters, e.g. [("rank", "lte", 5)],
+            applied by Postgres on the database reads and by Polars on the
+            snapshots. Only the operators of FILTER_OPERATORS. Defaults to all rows.
+
+    Returns:
+        pl.DataFrame: The mart data
+    """
+    manifest: dict | None = get_snapshot_manifest()
+    entry: dict | None = (manifest or {}).get("tables", {}).get(table_name)
+
+    if entry is None:
+        return _read_mart_table(table_name, key, version, schema, filters)
+
+    # The snapshot of an empty mart has no columns, return the empty typed frame
+    if entry["rows"] == 0:
+        return pl.DataFrame(schema=schema)
+
+    data: pl.DataFrame = _read_mart_snapshot(entry["file"], entry["etag"])
+
+    if filters:
+        data = data.filter(_filters_expr(filters))
+
+    return data.select(list(schema)).cast(schema, strict=False)
+
+
+# endregion
+
+
+# region ------------ Month columns ------------
+def with_month_columns(data: pl.DataFrame) -> pl.DataFrame:
+    """
+    Parses the "YYYY-MM" month_year strings of a mart once, adding month_date (first
+    day of the month) and month_year_label (e.g. "Sep 2025") for the charts.
+
+    Args:
+        data (pl.DataFrame): A mart with the month_year column.
+
+    Returns:
+        pl.DataFrame: The mart with the month columns
+    """
+    return data.with_columns(
+        (pl.col("month_year") + "-01")
+        .str.to_date(format="%Y-%m-%d")
+        .alias("month_date")
+    ).with_columns(
+        pl.col("month_date").dt.strftime("%b %Y").alias("month_year_label")
+    )
+
+
+# endregion
+
+
+# region ------------ Query data from supabase ------------
+@st.cache_data(max_entries=2)
+def get_mart_rawg__kpis(version: str) -> dict:
+    """
+    Function to get the single row of mart_rawg__kpis, the header metrics of the page
+    precomputed by dbt, with last_updated_at parsed to a date.
+
+    Args:
+        version (str): The version of the marts (see get_marts_version).
+
+    Returns:
+        dict: The metrics by column name, empty if the mart was not built yet
+    """
+    kpis: pl.DataFrame = read_mart(
+        "mart_rawg__kpis",
+        key="kpi_id",
+        schema=MART_RAWG__KPIS_SCHEMA,
+        version=version,
+    )
+
+    if kpis.is_empty():
+        return {}
+
+    row: dict = kpis.row(0, named=True)
+    last_updated_at: str | None = row.pop("last_updated_at")
+    row["last_update_date"] = (
+        datetime.date.fromisoformat(last_updated_at[:10]) if last_updated_at else None
+    )
+
+    return row
+
+
+@st.cache_data(max_entries=2)
+def get_mart_rawg__releases_by_games_monthyear(version: str) -> pl.DataFrame:
+    """
+    Function to get the table mart_rawg__releases_by_games_monthyear, sorted by month.
+
+    Args:
+        version (str): The version of the marts (see get_marts_version).
+
+    Returns:
+        pl.DataFrame: Polars dataframe with the queried data
+    """
+    return with_month_columns(
+        read_mart(
+            "mart_rawg__releases_by_games_monthyear",
+            key="month_year",
+            schema=MART_RAWG__RELEASES_BY_GAMES_MONTHYEAR_SCHEMA,
+            version=version,
+        )
+    ).sort("month_date")
+
+
+@st.cache_data(max_entries=2)
+def get_mart_rawg__releases_by_gametags_monthyear(version: str) -> pl.DataFrame:
+    """
+    Function to read the top TOP_TAGS_RANK tags of every month of the table
+    mart_rawg__releases_by_gametags_monthyear, sorted by month. The rank is filtered
+    on the read, the other tags are never sent to the page.
+
+    Args:
+        version (str): The version of the marts (see get_marts_version).
+
+    Returns:
+        pl.DataFrame: Polars dataframe with the queried data
+    """
+    return with_month_columns(
+        read_mart(
+            "mart_rawg__releases_by_gametags_monthyear",
+            key="row_id",
+            schema=MART_RAWG__RELEASES_BY_GAMETAGS_MONTHYEAR_SCHEMA,
+            version=version,
+            filters=[("rank", "lte", TOP_TAGS_RANK)],
+        )
+    ).sort("month_date", maintain_order=True)
+
+
+@st.cache_data(max_entries=2)
+def get_mart_rawg__releases_by_games_platform(version: str) -> pl.DataFrame:
+    """
+    Function to get the table mart_rawg__releases_by_games_platform.
+
+    Args:
+        version (str): The version of the marts (see get_marts_version).
+
+    Returns:
+        pl.DataFrame: Polars dataframe with the queried data
+    """
+    return with_month_columns(
+        read_mart(
+            "mart_rawg__releases_by_games_platform",
+            key="row_id",
+            schema=MART_RAWG__RELEASES_BY_GAMES_PLATFORM_SCHEMA,
+            version=version,
+        )
+    )
+
+
+# endregion
+
+
+# region ------------ Cache warm-up ------------
+def load_marts(version: str):
+    """
+    Loads every mart of the page for a version, filling the caches.
+
+    Args:
+        version (str): The version of the marts.
+    """
+    get_mart_rawg__kpis(version)
+    get_mart_rawg__releases_by_games_monthyear(version)
+    get_mart_rawg__releases_by_gametags_monthyear(version)
+    get_mart_rawg__releases_by_games_platform(version)
+
+
+@st.cache_resource
+def start_cache_warm_up(
+    interval_seconds: int = VERSION_CHECK_SECONDS,
+) -> threading.Thread:
+    """
+    Starts, once per Streamlit process, a background thread that checks the marts
+    version and loads the marts of every new version, so the first visit after a
+    pipeline run does not wait for the reload. Each replica of the app runs its own.
+
+    The thread is not attached to the script context of any session, it outlives the
+    session that started it. The st.cache_data caches are shared by the process, so
+    the loaders called from the thread fill the same entries the sessions read; only
+    the spinners need a session, the version checks run without one. A thread started
+    by a previous version of this module (Streamlit reloads it when the source
+    changes) is stopped first.
+
+    Args:
+        interval_seconds (int, optional): Seconds between checks. Defaults to
+            VERSION_CHECK_SECONDS.
+
+    Returns:
+        threading.Thread: The warm-up thread
+    """
+    for running in threading.enumerate():
+        if running.name == WARM_UP_THREAD_NAME and hasattr(running, "stop_event"):
+            running.stop_event.set()
+
+    stop_event = threading.Event()
+
+    def warm_up():
+        loaded_version: str | None = None
+
+        while not stop_event.is_set():
+            try:
+                version: str = get_marts_version()
+
+                if version != loaded_version:
+                    start_time = time.time()
+                    load_marts(version)
+                    loaded_version = version
+                    logger.info(
+                        "Warmed up the marts version %s in %.2f seconds",
+                        version,
+                        time.time() - start_time,
+                    )
+            except Exception:
+                logger.exception("Failed to warm up the marts caches")
+
+            stop_event.wait(interval_seconds)
+
+    thread = threading.Thread(target=warm_up, name=WARM_UP_THREAD_NAME, daemon=True)
+    thread.stop_event = stop_event
+    thread.start()
+
+    return thread
+
+
+# endregion
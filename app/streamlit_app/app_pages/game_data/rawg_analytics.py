@@ -7,136 +7,35 @@ import polars as pl
 import altair as alt
 import datetime
 
-from pathlib import Path
-from supabase import create_client, Client
+from app.streamlit_app.app_data.rawg_marts import (
+    get_marts_version,
+    get_mart_rawg__kpis,
+    get_mart_rawg__releases_by_games_monthyear,
+    get_mart_rawg__releases_by_games_platform,
+    get_mart_rawg__releases_by_gametags_monthyear,
+    start_cache_warm_up,
+)
 
 st.set_page_config(page_title="Overview", layout="wide")
 
 
-# region ------------ Supabase connection ------------
-@st.cache_resource
-def init_connection():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
-
-supabase: Client = init_connection()
-
-# endregion
-
-
-# region ------------ Query data from supabase------------
-@st.cache_data(ttl=3600)
-def get_mart_rawg__games() -> list[dict]:
-    """
-    Function to paginate all the data available on supabase and save as a polars
-    dataframe.
-
-    Returns:
-        pl.DataFrame: list of dicts with all the queried data
-    """
-    all_results: list[dict] = []
-    batch_size: int = 1000
-    start = 0
-
-    while True:
-        response = (
-            supabase.schema("public_marts")
-            .table("mart_rawg__games")
-            .select("*")
-            .range(start=start, end=start + batch_size - 1)
-            .execute()
-        )
-
-        data: list[dict] = response.data
-        if not data:
-            break
-        all_results.extend(data)
-        start += batch_size
-
-    return all_results
-
-
-@st.cache_data(ttl=3600)
-def get_mart_rawg__releases_by_games_monthyear() -> pl.DataFrame:
-    """
-    Function to get the table mart_game_releases_by_month_year.
-
-    Returns:
-        pl.DataFrame: Polars dataframe with the queried data
-    """
-    return pl.DataFrame(
-        data=supabase.schema("public_marts")
-        .table("mart_rawg__releases_by_games_monthyear")
-        .select("*")
-        .execute()
-        .data,
-        strict=False,
-    )
-
-
-@st.cache_data(ttl=3600)
-def get_mart_rawg__releases_by_gametags_monthyear() -> list[dict]:
-    """
-    Function to paginate all the data available on the table
-    mart_rawg__releases_by_gametags_monthyear and save as a polars dataframe.
-
-    Returns:
-        pl.DataFrame: list of dicts with the queried data
-    """
-    all_results: list[dict] = []
-    batch_size: int = 1000
-    start = 0
-
-    while True:
-        response = (
-            supabase.schema("public_marts")
-            .table("mart_rawg__releases_by_gametags_monthyear")
-            .select("*")
-            .range(start=start, end=start + batch_size - 1)
-            .execute()
-        )
-
-        data: list[dict] = response.data
-        if not data:
-            break
-        all_results.extend(data)
-        start += batch_size
-
-    return all_results
-
-
-@st.cache_data(ttl=3600)
-def get_mart_rawg__releases_by_games_platform() -> pl.DataFrame:
-    """
-    Function to get the table mart_rawg__releases_by_games_platform.
-
-    Returns:
-        pl.DataFrame: Polars dataframe with the queried data
-    """
-    all_results: list[dict] = []
-    batch_size: int = 1000
-    start = 0
-
-    while True:
-        response = (
-            supabase.schema("public_marts")
-            .table("mart_rawg__releases_by_games_platform")
-            .select("*")
-            .range(start=start, end=start + batch_size - 1)
-            .execute()
-        )
-
-        data: list[dict] = response.data
-        if not data:
-            break
-        all_results.extend(data)
-        start += batch_size
-
-    return all_results
-
+# region ------------ Load data ------------
+# Reloads the marts in the background after each pipeline run
+if st.secrets.get("MARTS_CACHE_WARM_UP", False):
+    start_cache_warm_up()
 
+# Typed frames cached by the data layer per marts version, shared by every widget
+marts_version: str = get_marts_version()
+kpis: dict = get_mart_rawg__kpis(marts_version)
+releases_by_month_year: pl.DataFrame = get_mart_rawg__releases_by_games_monthyear(
+    marts_version
+)
+releases_by_platform: pl.DataFrame = get_mart_rawg__releases_by_games_platform(
+    marts_version
+)
+games_by_tag: pl.DataFrame = get_mart_rawg__releases_by_gametags_monthyear(
+    marts_version
+)
 # endregion
 
 
@@ -147,26 +46,12 @@ st.write("---")
 
 metric_col1, metric_col2, metric_col3 = st.columns(spec=3, vertical_alignment="center")
 
+# Precomputed by dbt in mart_rawg__kpis, one small query for the whole header
 with metric_col1:
-    total_game_releases: int = (
-        pl.DataFrame(
-            data=get_mart_rawg__releases_by_games_monthyear(),
-            strict=False,
-        )
-        .select("game_count")
-        .sum()
-        .item()
-    )
+    total_game_releases: int | None = kpis.get("total_game_releases")
 
-    last_update_date: str = (
-        pl.DataFrame(
-            data=get_mart_rawg__games(),
-            strict=False,
-        )
-        .select("updated_at")
-        .max()
-        .item()[:10]
-    )
+    last_update: datetime.date | None = kpis.get("last_update_date")
+    last_update_date: str = last_update.isoformat() if last_update else "-"
 
     start_date: str = "2025-09-01"
     end__date: str = last_update_date
@@ -179,21 +64,7 @@ with metric_col1:
     )
 
 with metric_col2:
-    tag_releases: pl.DataFrame = pl.DataFrame(
-        data=get_mart_rawg__releases_by_gametags_monthyear(),
-        strict=False,
-    )
-
-    total_by_tag: pl.DataFrame = tag_releases.group_by("game_tag").agg(
-        pl.col("tag_count").sum().alias("total_by_tag")
-    )
-
-    most_released_tags: pl.DataFrame = (
-        total_by_tag.sort(by="total_by_tag", descending=True)
-        .limit(1)
-        .select("game_tag")
-        .item()
-    )
+    most_released_tags: str | None = kpis.get("most_released_tag")
 
     st.metric(
         label="Most Released Tag",
@@ -202,24 +73,8 @@ with metric_col2:
     )
 
 with metric_col3:
-    total_game_releases: int = pl.DataFrame(
-        data=get_mart_rawg__releases_by_games_monthyear(),
-        strict=False,
-    )
-
-    period_most_releases: pl.DataFrame = (
-        total_game_releases.sort(by="game_count", descending=True)
-        .limit(1)
-        .select("month_year")
-        .item()
-    )
-
-    period_least_releases: pl.DataFrame = (
-        total_game_releases.sort(by="game_count", descending=False)
-        .limit(1)
-        .select("month_year")
-        .item()
-    )
+    period_most_releases: str | None = kpis.get("period_most_releases")
+    period_least_releases: str | None = kpis.get("period_least_releases")
 
     st.metric(
         label="Period with Most Releases",
@@ -244,27 +99,11 @@ with col1:
         ### Total Game Releases by Month / Year
         """)
 
-    releases_by_month_year: pl.DataFrame = pl.DataFrame(
-        data=get_mart_rawg__releases_by_games_monthyear(),
-        strict=False,
-    )
-
-    releases_by_month_year = releases_by_month_year.select(
-        pl.col("month_year"), pl.col("game_count")
-    )
-
-    releases_by_month_year = releases_by_month_year.with_columns(
-        (pl.col("month_year") + "-01")
-        .str.to_date(format="%Y-%m-%d")
-        .alias("month_year")
+    # Months already sorted and labeled by the data layer
+    chart_data = releases_by_month_year.select(
+        pl.col("month_year_label"), pl.col("game_count")
     )
 
-    # Creating labels for the dates
-    chart_data = releases_by_month_year.with_columns(
-        pl.col("month_year").dt.strftime("%Y-%m").alias("month_year_sort"),
-        pl.col("month_year").dt.strftime("%b %Y").alias("month_year_label"),
-    ).sort(by="month_year_sort", descending=False)
-
     max_games_released = chart_data.select("game_count").max().item()
     min_games_released = chart_data.select("game_count").min().item()
 
@@ -276,7 +115,7 @@ with col1:
         .then(pl.lit("Least Releases"))
         .otherwise(pl.lit("Other"))
         .alias("highlight"),
-    ).sort(by="month_year_sort", descending=False)
+    )
 
     tags_chart_base = alt.Chart(data=chart_data).encode(
         x=alt.X(
@@ -313,26 +152,15 @@ with col2:
     # region ------------ Releases by Platform ------------
     st.markdown("### Most Releases by Platform")
 
-    releases_by_platform: pl.DataFrame = pl.DataFrame(
-        data=get_mart_rawg__releases_by_games_platform(),
-        strict=False,
-    )
-
-    releases_by_platform = releases_by_platform.select(
+    platform_chart_data: pl.DataFrame = releases_by_platform.select(
         pl.col("platform_name"),
         pl.col("parent_platform_name"),
         pl.col("platform_releases_count"),
-        pl.col("month_year"),
+        pl.col("month_date"),
         pl.col("rank_category"),
     )
 
-    releases_by_platform = releases_by_platform.with_columns(
-        (pl.col("month_year") + "-01")
-        .str.to_date(format="%Y-%m-%d")
-        .alias("month_year")
-    )
-
-    games_platform_chart_base = alt.Chart(data=releases_by_platform).encode(
+    games_platform_chart_base = alt.Chart(data=platform_chart_data).encode(
         y=alt.Y(
             "platform_releases_count:Q",
             title="Releases",
@@ -351,7 +179,7 @@ with col2:
         color=alt.Color(
             "platform_name:N",
             scale=alt.Scale(
-                domain=releases_by_platform.select("platform_name")
+                domain=platform_chart_data.select("platform_name")
                 .unique()
                 .to_series(),
             ),
@@ -392,24 +220,8 @@ st.markdown("""
     """)
 
 
-games_by_tag: pl.DataFrame = pl.DataFrame(
-    data=get_mart_rawg__releases_by_gametags_monthyear(),
-    strict=False,
-)
-
-games_by_tag = games_by_tag.with_columns(
-    (pl.col("month_year") + "-01").str.to_date(format="%Y-%m-%d").alias("month_year")
-)
-
-chart_data = games_by_tag.with_columns(
-    pl.col("month_year").dt.strftime("%Y-%m").alias("month_year_sort"),
-    pl.col("month_year").dt.strftime("%b %Y").alias("month_year_label"),
-).sort(by="month_year_sort", descending=False)
-
-chart_data = chart_data.filter(pl.col("rank") <= 5)
-
 current_month_year = datetime.datetime.now().strftime("%Y-%m")
-chart_data = chart_data.filter(pl.col("month_year_sort") != current_month_year)
+chart_data = games_by_tag.filter(pl.col("month_year") != current_month_year)
 
 tags_chart_base = (
     alt.Chart(data=chart_data)
@@ -2,8 +2,16 @@
 Main file for the Streamlit app, will be used to run the app and the app pages
 """
 
+import sys
 import streamlit as st
 
+from pathlib import Path
+
+# Make the project root importable, the pages share the query helpers in src/
+PROJECT_ROOT: Path = Path(__file__).parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
 pgs: dict = {
     "HOME": [
         st.Page(title="Welcome", page="./app_pages/home/welcome.py"),
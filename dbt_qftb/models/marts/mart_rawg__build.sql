@@ -0,0 +1,20 @@
+--- written after every other mart, so the dashboard never sees a new build id over old
+--- data
+-- depends_on: {{ ref("mart_rawg__games") }}
+-- depends_on: {{ ref("mart_rawg__kpis") }}
+-- depends_on: {{ ref("mart_rawg__releases_by_games_monthyear") }}
+-- depends_on: {{ ref("mart_rawg__releases_by_games_platform") }}
+-- depends_on: {{ ref("mart_rawg__releases_by_gametags_monthyear") }}
+
+with
+
+final as (
+    select
+        -- ids
+        '{{ invocation_id }}' as build_id,
+
+        -- timestamps
+        CURRENT_TIMESTAMP as built_at
+)
+
+select * from final
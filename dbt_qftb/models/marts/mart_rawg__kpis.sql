@@ -0,0 +1,107 @@
+with
+
+releases_by_month as (
+    select * from {{ ref("mart_rawg__releases_by_games_monthyear") }}
+),
+
+releases_by_tag as (
+    select * from {{ ref("mart_rawg__releases_by_gametags_monthyear") }}
+),
+
+games as (
+    select * from {{ ref("mart_rawg__games") }}
+),
+
+total_releases as (
+    select
+        -- aggregations
+        SUM(game_count) as total_game_releases
+
+    from releases_by_month
+),
+
+most_released_tag as (
+    select
+        game_tag as most_released_tag,
+
+        -- aggregations
+        SUM(tag_count) as most_released_tag_count
+
+    from releases_by_tag
+
+    group by game_tag
+
+    order by
+        most_released_tag_count desc,
+        game_tag asc
+
+    limit 1
+),
+
+period_most_releases as (
+    select
+        month_year as period_most_releases,
+        game_count as period_most_releases_count
+
+    from releases_by_month
+
+    order by
+        game_count desc,
+        month_year asc
+
+    limit 1
+),
+
+period_least_releases as (
+    select
+        month_year as period_least_releases,
+        game_count as period_least_releases_count
+
+    from releases_by_month
+
+    order by
+        game_count asc,
+        month_year asc
+
+    limit 1
+),
+
+last_update as (
+    select
+        -- timestamps
+        MAX(updated_at) as last_updated_at
+
+    from games
+),
+
+final as (
+    select
+        -- ids
+        1 as kpi_id,
+
+        -- numerics
+        t.total_game_releases,
+        tag.most_released_tag_count,
+        most.period_most_releases_count,
+        least.period_least_releases_count,
+
+        -- strings
+        tag.most_released_tag,
+        most.period_most_releases,
+        least.period_least_releases,
+
+        -- timestamps
+        lu.last_updated_at
+
+    from total_releases as t
+
+    cross join last_update as lu
+
+    left join most_released_tag as tag on true
+
+    left join period_most_releases as most on true
+
+    left join period_least_releases as least on true
+)
+
+select * from final
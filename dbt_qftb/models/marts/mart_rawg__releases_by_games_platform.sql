@@ -54,7 +54,12 @@ classify_platforms_by_rank as (
 ),
 
 ordered_platforms as (
-    select *
+    select
+        *,
+        --- surrogate key for keyset pagination on the dashboard reads
+        ROW_NUMBER() over (
+            order by month_year desc, rank asc, platform_name asc
+        ) as row_id
 
     from
         classify_platforms_by_rank
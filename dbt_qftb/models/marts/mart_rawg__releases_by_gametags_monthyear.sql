@@ -57,7 +57,12 @@ classify_tags_by_rank as (
 ),
 
 ordered_tags as (
-    select *
+    select
+        *,
+        --- surrogate key for keyset pagination on the dashboard reads
+        ROW_NUMBER() over (
+            order by month_year desc, rank asc, game_tag asc
+        ) as row_id
 
     from
         classify_tags_by_rank
@@ -0,0 +1,106 @@
+"""
+Command line entry point of the ETL - runs the chosen pipeline stages in a single
+process, so polars, aiohttp and the supabase client are imported and created once and
+every fetcher shares the same HTTP session.
+
+Usage:
+    python -m src.etl run games details tags
+    python -m src.etl run all --processes
+    python -m src.etl run fetch_platforms clean_platforms
+    python -m src.etl list
+    python -m src.etl export
+"""
+
+import argparse
+
+from src.etl.pipeline import STAGES, main as run_pipeline_main
+
+# region ------------ Targets ------------
+# Short names of the datasets, each one runs its fetch and clean stages
+DATASETS: dict[str, str] = {
+    "games": "games",
+    "details": "game_details",
+    "game_details": "game_details",
+    "tags": "tags",
+    "tag_details": "tag_details",
+    "platforms": "platforms",
+    "parent_platforms": "parent_platforms",
+}
+
+
+def resolve_stages(targets: list[str]) -> list[str] | None:
+    """
+    Converts the targets of the command line to stage names. A target is a dataset
+    (e.g. "games" runs fetch_games and clean_games), a stage name, or "all".
+
+    Args:
+        targets (list[str]): The targets given by the user.
+
+    Returns:
+        list[str] | None: The stage names, or None for every stage
+    """
+    if "all" in targets:
+        return None
+
+    stage_names: list[str] = []
+    for target in targets:
+        if target in DATASETS:
+            dataset: str = DATASETS[target]
+            stage_names.extend([f"fetch_{dataset}", f"clean_{dataset}"])
+        else:
+            stage_names.append(target)
+
+    return stage_names
+
+
+# endregion
+
+
+# region ------------ Main ------------
+def main():
+    parser = argparse.ArgumentParser(prog="python -m src.etl", description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run pipeline stages")
+    run_parser.add_argument(
+        "targets",
+        nargs="+",
+        help=f"'all', datasets ({', '.join(DATASETS)}) or stage names",
+    )
+    run_parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="Run the cleaners in a process pool instead of threads of this process",
+    )
+
+    subparsers.add_parser("list", help="List the stages and their dependencies")
+
+    export_parser = subparsers.add_parser(
+        "export", help="Export the dbt marts to Parquet snapshots"
+    )
+    export_parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Only write the snapshots to disk, even if MART_SNAPSHOTS_BUCKET is set",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for stage in STAGES:
+            print(f"{stage.name:<24} after: {', '.join(stage.depends_on) or '-'}")
+        return
+
+    if args.command == "export":
+        from src.utils.mart_snapshots import SNAPSHOTS_BUCKET, main as export_main
+
+        export_main(bucket=None if args.local else SNAPSHOTS_BUCKET)
+        return
+
+    run_pipeline_main(resolve_stages(args.targets), processes=args.processes)
+
+
+# endregion
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+File to handle the checkpoint manifests of the paginated fetchers - records which pages
+of a query are already saved, so a rerun after a failure fetches only the missing pages
+instead of spending API quota on pages it already has.
+"""
+
+import os
+import json
+import hashlib
+import datetime
+
+from pathlib import Path
+from dotenv import load_dotenv
+from src.utils.logger import setup_logger
+
+# region ------------ Load env variables ------------
+load_dotenv()
+
+# Days after which an incomplete query is dropped instead of resumed
+CHECKPOINT_MAX_AGE_DAYS: float = float(os.getenv("RAWG_CHECKPOINT_MAX_AGE_DAYS", 7))
+# endregion
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ Get project path ------------
+PROJECT_ROOT: Path = Path(__file__).parent.parent.parent
+CHECKPOINTS_DIR: Path = PROJECT_ROOT / "data_local" / "checkpoints" / "rawg"
+# endregion
+
+
+# region ------------ Page checkpoint ------------
+class PageCheckpoint:
+    """
+    Manifest on disk for one paginated query. The query is identified by the endpoint
+    and its key params (e.g. the start of the `dates` window and `page_size`), so a
+    different query never resumes from this manifest. Values that move between runs,
+    like an end date of today, are left out of the key, and a resumed query is fetched
+    again with the params saved by the run that started it.
+
+    The manifest only exists while the query is incomplete, it is deleted once every
+    page is saved.
+
+    Args:
+        endpoint (str): The endpoint after the base url, e.g. "games".
+        params (dict): Query params of the paginated query, without the page.
+        key_params (dict, optional): Params identifying the query. Defaults to params.
+    """
+
+    def __init__(self, endpoint: str, params: dict, key_params: dict | None = None):
+        key: dict = params if key_params is None else key_params
+        query: str = json.dumps(
+            {"endpoint": endpoint, "params": key}, sort_keys=True, default=str
+        )
+        query_hash: str = hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+
+        self.endpoint: str = endpoint
+        self.params: dict = params
+        self.path: Path = (
+            CHECKPOINTS_DIR / f"{endpoint.replace('/', '_')}_{query_hash}.json"
+        )
+
+        self.filename: Path | None = None
+        self.total_pages: int | None = None
+        self.done_pages: set[int] = set()
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest: dict = json.load(f)
+
+            self.params = manifest["params"]
+            self.filename = Path(manifest["filename"])
+            self.total_pages = manifest["total_pages"]
+            self.done_pages = set(manifest["done_pages"])
+
+    @property
+    def is_resumed(self) -> bool:
+        """
+        True if a previous run left this query incomplete.
+        """
+        return self.total_pages is not None
+
+    def start(self, filename: Path, total_pages: int):
+        """
+        Creates the manifest of a new query.
+
+        Args:
+            filename (Path): The .jsonl file receiving the pages.
+            total_pages (int): Total pages of the query.
+        """
+        self.filename = filename
+        self.total_pages = total_pages
+        self.done_pages = set()
+        self._save()
+
+    def missing_pages(self) -> list[int]:
+        """
+        Returns the pages not saved yet, in order.
+        """
+        return [
+            page
+            for page in range(1, self.total_pages + 1)
+            if page not in self.done_pages
+        ]
+
+    def mark_done(self, page: int):
+        """
+        Records a page as saved. Call it only after the page is flushed to the file.
+
+        Args:
+            page (int): The page number.
+        """
+        self.done_pages.add(page)
+        self._save()
+
+    def complete(self):
+        """
+        Removes the manifest once every page is saved.
+        """
+        self.path.unlink(missing_ok=True)
+
+    def _save(self):
+        CHECKPOINTS_DIR.mkdir(parents=True, exist_ok=True)
+        manifest: dict = {
+            "endpoint": self.endpoint,
+            "params": self.params,
+            "filename": str(self.filename),
+            "total_pages": self.total_pages,
+            "done_pages": sorted(self.done_pages),
+            "updated_at": datetime.datetime.now().isoformat(),
+        }
+
+        # Write to a temp file and replace, so a crash never leaves a broken manifest
+        temp_path: Path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, default=str)
+        os.replace(temp_path, self.path)
+
+
+# endregion
+
+
+# region ------------ Remove stale checkpoints ------------
+def remove_stale_checkpoints(max_age_days: float = CHECKPOINT_MAX_AGE_DAYS) -> int:
+    """
+    Deletes the manifests of queries left incomplete for more than `max_age_days`,
+    so an old failure is fetched again from scratch instead of resumed. The partial
+    .jsonl files are kept.
+
+    Args:
+        max_age_days (float, optional): Max age of a manifest. Defaults to
+            RAWG_CHECKPOINT_MAX_AGE_DAYS (7).
+
+    Returns:
+        int: Number of manifests deleted
+    """
+    oldest: datetime.datetime = datetime.datetime.now() - datetime.timedelta(
+        days=max_age_days
+    )
+    removed: int = 0
+
+    for path in CHECKPOINTS_DIR.glob("*.json"):
+        with open(path, "r", encoding="utf-8") as f:
+            updated_at: str = json.load(f)["updated_at"]
+
+        if datetime.datetime.fromisoformat(updated_at) < oldest:
+            path.unlink(missing_ok=True)
+            removed += 1
+            logger.info("Removed stale checkpoint %s (updated at %s)", path, updated_at)
+
+    return removed
+
+
+# endregion
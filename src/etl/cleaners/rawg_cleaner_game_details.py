@@ -8,9 +8,12 @@ import os
 import polars as pl
 
 from pathlib import Path
-from src.models.schema import GAME_DETAILS_SCHEMA
+from src.models.schema import (
+    GAME_DETAILS_SCHEMA,
+    RAWG_GAME_DETAILS_INPUT_SCHEMA,
+)
+from src.etl.ledger import ProcessedFileLedger
 from src.utils.logger import setup_logger
-from src.utils.supabase_client import supabase
 from src.utils.supabase_tools import upload_file, update_table
 
 # region ------------ Logger setup ------------
@@ -21,9 +24,6 @@ logger = setup_logger(__name__)
 PROJECT_ROOT: Path = Path(__file__).parent.parent.parent.parent
 DATA_LOCAL_RAW: Path = PROJECT_ROOT / "data_local" / "raw" / "rawg" / "game_details"
 DATA_LOCAL_TEMP: Path = PROJECT_ROOT / "data_local" / "temp" / "rawg" / "game_details"
-
-DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
-DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
 # endregion
 
 
@@ -34,50 +34,37 @@ def main():
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
-    # region ------------ Get recent data ------------
-    # Get all json files in the folder and sort them by most recent
-    files: list[Path] = [
-        os.path.join(DATA_LOCAL_RAW, f)
-        for f in os.listdir(DATA_LOCAL_RAW)
-        if f.endswith(".jsonl")
-    ]
+    DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
+
+    DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
+
+    # region ------------ Get new data ------------
+    ledger: ProcessedFileLedger = ProcessedFileLedger("game_details")
+    files: list[Path] = ledger.files_to_process(DATA_LOCAL_RAW)
 
     if not files:
-        logger.error("No JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW)
+        logger.error("No new JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW)
         return
 
-    files.sort(key=os.path.getmtime, reverse=True)
-    latest_file: Path = files[0]
-    logger.info("Latest file found: %s", latest_file)
+    logger.info("Files to process: %s", [file.name for file in files])
     # endregion
 
     # region ------------ Extract data and create DataFrame ------------
     logger.info("Reading JSON and creating DataFrame with Polars...")
 
     latest_file_timestamp: datetime.datetime = datetime.datetime.fromtimestamp(
-        os.path.getmtime(latest_file)
+        max(os.path.getmtime(file) for file in files)
     )
 
-    # region ------------ Override schema types ------------
-    # For itens that have a struct, override the schema to resolve possible null values
-    schema_override: dict[str, pl.PolarsDataType] = {
-        "esrb_rating": pl.Struct({"id": pl.Int64}),
-        "ratings": pl.List(pl.Struct({"id": pl.Int64})),
-        "genres": pl.List(pl.Struct({"id": pl.Int64})),
-        "tags": pl.List(pl.Struct({"id": pl.Int64})),
-        "developers": pl.List(pl.Struct({"id": pl.Int64})),
-        "publishers": pl.List(pl.Struct({"id": pl.Int64})),
-        "platforms": pl.List(pl.Struct({"platform": pl.Struct({"id": pl.Int64})})),
-    }
-    # endregion
-
-    df_raw = pl.read_ndjson(
-        latest_file, infer_schema_length=None, schema_overrides=schema_override
+    # Only the selected fields are parsed, description (HTML) and the other unused
+    # fields of the payload are never materialized
+    lf_raw: pl.LazyFrame = pl.scan_ndjson(
+        files, schema=RAWG_GAME_DETAILS_INPUT_SCHEMA
     )
 
     # Turn off formatter for this block for readability
     # fmt: off
-    df: pl.DataFrame = df_raw.select(
+    lf: pl.LazyFrame = lf_raw.select(
         pl.col("id")
             .alias("game_id"),
         pl.col("description_raw"),
@@ -119,7 +106,13 @@ def main():
     ).with_columns(pl.lit(latest_file_timestamp).alias("updated_at"))
     # fmt: on
 
-    df = df.cast(GAME_DETAILS_SCHEMA)
+    # Keep the most recently updated details of a game fetched in more than one file
+    df: pl.DataFrame = (
+        lf.cast(GAME_DETAILS_SCHEMA)
+        .sort("updated_on_rawg", nulls_last=False, maintain_order=True)
+        .unique(subset=["game_id"], keep="last")
+        .collect(engine="streaming")
+    )
 
     logger.info(
         "Finished reading JSON and creating DataFrame at %s. Shape: %s",
@@ -137,7 +130,6 @@ def main():
 
     # region ------------ Upload to Supabase ------------
     logger.info("Starting upload to Supabase...")
-    df_cleaned: pl.DataFrame = pl.read_parquet(filename)
 
     upload_file(
         local_path=str(filename),
@@ -145,7 +137,12 @@ def main():
         bucket="rawg-data",
         folder="game_details",
     )
-    update_table(table_name="rawg_game_details", data_to_update=df_cleaned)
+    update_table(
+        table_name="rawg_game_details",
+        data_to_update=df,
+        skip_unchanged=True,
+    )
+    ledger.record(files)
 
     end_time = time.time()
     elapsed_time = end_time - start_time
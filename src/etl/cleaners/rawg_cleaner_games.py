@@ -7,10 +7,10 @@ import time
 import os
 import polars as pl
 
-from src.utils.supabase_client import supabase
 from src.utils.supabase_tools import upload_file, update_table
 from pathlib import Path
-from src.models.schema import GAME_SCHEMA
+from src.models.schema import GAME_SCHEMA, RAWG_GAMES_INPUT_SCHEMA
+from src.etl.ledger import ProcessedFileLedger
 from src.utils.logger import setup_logger
 
 
@@ -22,9 +22,6 @@ logger = setup_logger(__name__)
 PROJECT_ROOT: Path = Path(__file__).parent.parent.parent.parent
 DATA_LOCAL_RAW: Path = PROJECT_ROOT / "data_local" / "raw" / "rawg" / "games"
 DATA_LOCAL_TEMP: Path = PROJECT_ROOT / "data_local" / "temp" / "rawg" / "games"
-
-DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
-DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
 # endregion
 
 
@@ -35,106 +32,37 @@ def main():
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
-    # region ------------ Get recent data ------------
-    # Get all json files in the folder and sort them by most recent
-    files: list[Path] = [
-        os.path.join(DATA_LOCAL_RAW, f)
-        for f in os.listdir(DATA_LOCAL_RAW)
-        if f.endswith(".json")
-    ]
+    DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
+
+    DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
+
+    # region ------------ Get new data ------------
+    # Every raw file not loaded yet, oldest first (RAWG_CLEANER_MODE=latest to process
+    # only the most recent file)
+    ledger: ProcessedFileLedger = ProcessedFileLedger("games")
+    files: list[Path] = ledger.files_to_process(DATA_LOCAL_RAW)
 
     if not files:
-        logger.error("No JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW)
+        logger.error("No new JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW)
         return
 
-    files.sort(key=os.path.getmtime, reverse=True)
-    latest_file: Path = files[0]
-    logger.info("Latest file found: %s", latest_file)
+    logger.info("Files to process: %s", [file.name for file in files])
     # endregion
 
     # region ------------ Extract data and create DataFrame ------------
     logger.info("Reading JSON and creating DataFrame with Polars...")
 
     latest_file_timestamp: datetime.datetime = datetime.datetime.fromtimestamp(
-        os.path.getmtime(latest_file)
+        max(os.path.getmtime(file) for file in files)
     )
 
-    # region ------------ Override schema types ------------
-    # For itens that have a struct, override the schema to resolve possible null values
-    schema_override = {
-        "ratings": pl.List(
-            pl.Struct(
-                {
-                    "id": pl.Int64,
-                    "title": pl.Utf8,
-                    "count": pl.Int64,
-                    "percent": pl.Float64,
-                }
-            )
-        ),
-        "added_by_status": pl.Struct(
-            {
-                "yet": pl.Int64,
-                "owned": pl.Int64,
-                "beaten": pl.Int64,
-                "toplay": pl.Int64,
-                "dropped": pl.Int64,
-                "playing": pl.Int64,
-            }
-        ),
-        # Added name and slug so Polars doesn't complain about "extra fields"
-        "esrb_rating": pl.Struct(
-            {
-                "id": pl.Int64,
-                "name": pl.Utf8,
-                "slug": pl.Utf8,
-                "name_en": pl.Utf8,
-                "name_ru": pl.Utf8,
-            }
-        ),
-        "platforms": pl.List(
-            pl.Struct(
-                {
-                    "platform": pl.Struct(
-                        {"id": pl.Int64, "name": pl.Utf8, "slug": pl.Utf8}
-                    ),
-                    "released_at": pl.Utf8,  # Pode vir em alguns jogos
-                    "requirements_en": pl.Struct(
-                        {"minimum": pl.Utf8, "recommended": pl.Utf8}
-                    ),
-                    "requirements_ru": pl.Struct(
-                        {"minimum": pl.Utf8, "recommended": pl.Utf8}
-                    ),
-                    "requirements": pl.Struct(
-                        {"minimum": pl.Utf8, "recommended": pl.Utf8}
-                    ),
-                }
-            )
-        ),
-        "genres": pl.List(
-            pl.Struct({"id": pl.Int64, "name": pl.Utf8, "slug": pl.Utf8})
-        ),
-        "stores": pl.List(
-            pl.Struct(
-                {
-                    "id": pl.Int64,
-                    "url": pl.Utf8,
-                    "store": pl.Struct(
-                        {"id": pl.Int64, "name": pl.Utf8, "slug": pl.Utf8}
-                    ),
-                }
-            )
-        ),
-    }
-    # endregion
-
-    df_raw = pl.read_json(
-        latest_file, infer_schema_length=None, schema_overrides=schema_override
-    )
+    # Lazy scan with the input schema: no inference pass, only the selected fields
+    # are parsed and the streaming engine reads the file in batches
+    lf_raw: pl.LazyFrame = pl.scan_ndjson(files, schema=RAWG_GAMES_INPUT_SCHEMA)
 
     # Turn off formatter for this block for readability
     # fmt: off
-    df: pl.DataFrame = df_raw.select(
+    lf: pl.LazyFrame = lf_raw.select(
         pl.col("id").alias("game_id"),
         pl.col("slug"),
         pl.col("name"),
@@ -219,7 +147,14 @@ def main():
     ).with_columns(pl.lit(latest_file_timestamp).alias("updated_at"))
 
 
-    df = df.cast(GAME_SCHEMA)
+    # A game can be in more than one file (or page of a resumed fetch), keep the row
+    # most recently updated on RAWG for the upsert
+    df: pl.DataFrame = (
+        lf.cast(GAME_SCHEMA)
+        .sort("updated_on_rawg", nulls_last=False, maintain_order=True)
+        .unique(subset=["game_id"], keep="last")
+        .collect(engine="streaming")
+    )
 
     logger.info(
         "Finished reading JSON and creating DataFrame at %s. Shape: %s",
@@ -240,12 +175,14 @@ def main():
 
     # region ------------ Upload to Supabase ------------
     logger.info("Starting upload to Supabase...")
-    df_cleaned: pl.DataFrame = pl.read_parquet(filename)
 
     upload_file(
         local_path=str(filename), filename=filename, bucket="rawg-data", folder="games"
     )
-    update_table(table_name="rawg_games", data_to_update=df_cleaned)
+    update_table(
+        table_name="rawg_games", data_to_update=df, skip_unchanged=True
+    )
+    ledger.record(files)
 
     end_time = time.time()
     elapsed_time = end_time - start_time
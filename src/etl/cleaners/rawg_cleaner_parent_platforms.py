@@ -7,10 +7,13 @@ import time
 import os
 import polars as pl
 
-from src.utils.supabase_client import supabase
 from src.utils.supabase_tools import upload_file, update_table
 from pathlib import Path
-from src.models.schema import PARENT_PLATFORMS_SCHEMA
+from src.models.schema import (
+    PARENT_PLATFORMS_SCHEMA,
+    RAWG_PARENT_PLATFORMS_INPUT_SCHEMA,
+)
+from src.etl.ledger import ProcessedFileLedger
 from src.utils.logger import setup_logger
 
 # region ------------ Logger setup ------------
@@ -23,9 +26,6 @@ DATA_LOCAL_RAW: Path = PROJECT_ROOT / "data_local" / "raw" / "rawg" / "parent_pl
 DATA_LOCAL_TEMP: Path = (
     PROJECT_ROOT / "data_local" / "temp" / "rawg" / "parent_platforms"
 )
-
-DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
-DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
 # endregion
 
 
@@ -36,38 +36,37 @@ def main():
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
-    # region ------------ Get recent data ------------
-    # Get all json files in the folder and sort them by most recent
-    files: list[Path] = [
-        os.path.join(DATA_LOCAL_RAW, f)
-        for f in os.listdir(DATA_LOCAL_RAW)
-        if f.endswith(".json")
-    ]
+    DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
+
+    DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
+
+    # region ------------ Get new data ------------
+    ledger: ProcessedFileLedger = ProcessedFileLedger("parent_platforms")
+    files: list[Path] = ledger.files_to_process(DATA_LOCAL_RAW)
 
     if not files:
-        logger.warning("No JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW)
+        logger.warning(
+            "No new JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW
+        )
         return
 
-    files.sort(key=os.path.getmtime, reverse=True)
-    latest_file: Path = files[0]
-    logger.info("Latest file found: %s", latest_file)
+    logger.info("Files to process: %s", [file.name for file in files])
     # endregion
 
     # region ------------ Extract data and create DataFrame ------------
     logger.info("Reading JSON and creating DataFrame with Polars...")
 
     latest_file_timestamp: datetime.datetime = datetime.datetime.fromtimestamp(
-        os.path.getmtime(latest_file)
+        max(os.path.getmtime(file) for file in files)
     )
 
-    df_raw = pl.read_json(
-        latest_file,
-        infer_schema_length=None,
+    lf_raw: pl.LazyFrame = pl.scan_ndjson(
+        files, schema=RAWG_PARENT_PLATFORMS_INPUT_SCHEMA
     )
 
     # Turn off formatter for this block for readability
     # fmt: off
-    df: pl.DataFrame = df_raw.select(
+    lf: pl.LazyFrame = lf_raw.select(
         pl.col("id").alias("parent_platform_id"),
         pl.col("slug"),
         pl.col("name"),
@@ -79,7 +78,11 @@ def main():
 
     # fmt: on
 
-    df = df.cast(PARENT_PLATFORMS_SCHEMA)
+    df: pl.DataFrame = (
+        lf.cast(PARENT_PLATFORMS_SCHEMA)
+        .unique(subset=["parent_platform_id"], keep="last")
+        .collect(engine="streaming")
+    )
 
     logger.info(
         "Finished reading JSON and creating DataFrame at %s. Shape: %s",
@@ -101,7 +104,6 @@ def main():
 
     # region ------------ Upload to Supabase ------------
     logger.info("Starting upload to Supabase...")
-    df_cleaned: pl.DataFrame = pl.read_parquet(filename)
 
     upload_file(
         local_path=str(filename),
@@ -111,9 +113,11 @@ def main():
     )
     update_table(
         table_name="rawg_parent_platform",
-        data_to_update=df_cleaned,
+        data_to_update=df,
         on_conflict="parent_platform_id",
+        skip_unchanged=True,
     )
+    ledger.record(files)
 
     end_time = time.time()
     elapsed_time = end_time - start_time
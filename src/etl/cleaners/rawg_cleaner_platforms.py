@@ -7,10 +7,10 @@ import time
 import os
 import polars as pl
 
-from src.utils.supabase_client import supabase
 from src.utils.supabase_tools import upload_file, update_table
 from pathlib import Path
-from src.models.schema import PLATFORMS_SCHEMA
+from src.models.schema import PLATFORMS_SCHEMA, RAWG_PLATFORMS_INPUT_SCHEMA
+from src.etl.ledger import ProcessedFileLedger
 from src.utils.logger import setup_logger
 
 # region ------------ Logger setup ------------
@@ -21,9 +21,6 @@ logger = setup_logger(__name__)
 PROJECT_ROOT: Path = Path(__file__).parent.parent.parent.parent
 DATA_LOCAL_RAW: Path = PROJECT_ROOT / "data_local" / "raw" / "rawg" / "platforms"
 DATA_LOCAL_TEMP: Path = PROJECT_ROOT / "data_local" / "temp" / "rawg" / "platforms"
-
-DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
-DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
 # endregion
 
 
@@ -34,38 +31,37 @@ def main():
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
-    # region ------------ Get recent data ------------
-    # Get all json files in the folder and sort them by most recent
-    files: list[Path] = [
-        os.path.join(DATA_LOCAL_RAW, f)
-        for f in os.listdir(DATA_LOCAL_RAW)
-        if f.endswith(".json")
-    ]
+    DATA_LOCAL_RAW.mkdir(parents=True, exist_ok=True)
+
+    DATA_LOCAL_TEMP.mkdir(parents=True, exist_ok=True)
+
+    # region ------------ Get new data ------------
+    ledger: ProcessedFileLedger = ProcessedFileLedger("platforms")
+    files: list[Path] = ledger.files_to_process(DATA_LOCAL_RAW)
 
     if not files:
-        logger.warning("No JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW)
+        logger.warning(
+            "No new JSON files found in %s. Aborting cleaner.", DATA_LOCAL_RAW
+        )
         return
 
-    files.sort(key=os.path.getmtime, reverse=True)
-    latest_file: Path = files[0]
-    logger.info("Latest file found: %s", latest_file)
+    logger.info("Files to process: %s", [file.name for file in files])
     # endregion
 
     # region ------------ Extract data and create DataFrame ------------
     logger.info("Reading JSON and creating DataFrame with Polars...")
 
     latest_file_timestamp: datetime.datetime = datetime.datetime.fromtimestamp(
-        os.path.getmtime(latest_file)
+        max(os.path.getmtime(file) for file in files)
     )
 
-    df_raw = pl.read_json(
-        latest_file,
-        infer_schema_length=None,
+    lf_raw: pl.LazyFrame = pl.scan_ndjson(
+        files, schema=RAWG_PLATFORMS_INPUT_SCHEMA
     )
 
     # Turn off formatter for this block for readability
     # fmt: off
-    df: pl.DataFrame = df_raw.select(
+    lf: pl.LazyFrame = lf_raw.select(
         pl.col("id").alias("platform_id"),
         pl.col("slug"),
         pl.col("name"),
@@ -76,7 +72,11 @@ def main():
         pl.col("year_end"),
     ).with_columns(pl.lit(latest_file_timestamp).alias("updated_at"))
 
-    df = df.cast(PLATFORMS_SCHEMA)
+    df: pl.DataFrame = (
+        lf.cast(PLATFORMS_SCHEMA)
+        .unique(subset=["platform_id"], keep="last")
+        .collect(engine="streaming")
+    )
 
     logger.info(
         "Finished reading JSON and creating DataFrame at %s. Shape: %s",
@@ -97,7 +97,6 @@ def main():
 
     # region ------------ Upload to Supabase ------------
     logger.info("Starting upload to Supabase...")
-    df_cleaned: pl.DataFrame = pl.read_parquet(filename)
 
     upload_file(
         local_path=str(filename),
@@ -107,9 +106,11 @@ def main():
     )
     update_table(
         table_name="rawg_platforms",
-        data_to_update=df_cleaned,
+        data_to_update=df,
         on_conflict="platform_id",
+        skip_unchanged=True,
     )
+    ledger.record(files)
 
     end_time = time.time()
     elapsed_time = end_time - start_time
@@ -11,16 +11,17 @@ import datetime
 import time
 import json
 import asyncio
-import aiohttp
-import polars as pl
 
 from pathlib import Path
 from dotenv import load_dotenv
+from collections.abc import AsyncIterator
+from itertools import islice
 from src.utils.supabase_tools import (
-    query_all_data_rawg_games,
-    init_connection,
-    query_existing_game_details_ids,
+    iter_game_details_delta,
+    refresh_game_details_delta,
 )
+from src.etl.rawg_client import RawgClient
+from src.etl.worker_pool import iterate_in_thread, run_worker_pool
 from src.utils.logger import setup_logger
 
 
@@ -34,67 +35,25 @@ logger = setup_logger(__name__)
 # endregion
 
 
-# region ------------ Connect to supabase ------------
-supabase = init_connection()
-# endregion
-
-
 # region ------------ API access config ------------
 API_KEY: str = os.getenv("RAWG_GAME_DETAILS_API_KEY")
-HEADERS: dict = {"accept": "application/json"}
-BASE_PARAMS: dict = {"key": API_KEY}
+ENDPOINT_GAME_DETAILS: str = "games/{game_id}"
+
+# Max requests per run, the most relevant games are fetched first. Unset = no limit
+REQUEST_BUDGET: int | None = (
+    int(os.getenv("RAWG_GAME_DETAILS_BUDGET"))
+    if os.getenv("RAWG_GAME_DETAILS_BUDGET")
+    else None
+)
 # endregion
 
 
 # region ------------ Get project path ------------
 PROJECT_ROOT: Path = Path(__file__).parent.parent.parent.parent
 DATA_LOCAL: Path = PROJECT_ROOT / "data_local" / "raw" / "rawg" / "game_details"
-DATA_LOCAL.mkdir(parents=True, exist_ok=True)
 # endregion
 
 
-async def fetch_game_details(
-    session: aiohttp.ClientSession,
-    game_id: int,
-    semaphore: asyncio.Semaphore,
-    max_retries: int = 3,
-) -> dict | None:
-    """
-    Fetches game details data from the RAWG API asynchronously.
-
-    Args:
-        session (aiohttp.ClientSession): The aiohttp session object.
-        game_id (int): The game ID to fetch data for.
-        semaphore (asyncio.Semaphore): The semaphore object to limit concurrency.
-        max_retries (int, optional): The maximum number of retries. Defaults to 3.
-    """
-    url: str = f"https://api.rawg.io/api/games/{game_id}"
-
-    async with semaphore:
-        for attempt in range(max_retries):
-            try:
-                async with session.get(
-                    url, headers=HEADERS, params=BASE_PARAMS
-                ) as response:
-                    response.raise_for_status()
-                    data: dict = await response.json()
-                    return data
-
-            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
-                if attempt == max_retries - 1:
-                    logger.error("----- FINAL FAILURE FOR GAME %s -----", game_id)
-                    return None
-
-                sleep_time = 2 ** (attempt + 1)
-                await asyncio.sleep(sleep_time)
-                logger.error(
-                    "Attempt %s failed for game %s, retrying in %s seconds...",
-                    attempt + 1,
-                    game_id,
-                    sleep_time,
-                )
-
-
 async def main():
     """
     Main function to run the fetcher.
@@ -105,43 +64,14 @@ async def main():
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
-    # region ------------ Get ID for all games ------------
-    logger.info("Querying Supabase for game IDs...")
-    all_games: list[dict] = query_all_data_rawg_games()
-
-    if not all_games:
-        logger.warning("No games found in Supabase, exiting...")
-        return
+    DATA_LOCAL.mkdir(parents=True, exist_ok=True)
 
     # region ------------ Create a Delta Load for fetching game details ------------
-    logger.info("Querying Supabase for existing game IDs with game details...")
-    existing_game_ids: list[int] = query_existing_game_details_ids()
-
-    df_all: pl.DataFrame = pl.DataFrame(data=all_games, infer_schema_length=None)
-    all_game_ids: list[int] = [int(x) for x in df_all["game_id"].to_list()]
-
-    existing_set = set([int(x) for x in existing_game_ids])
-    logger.info("Total games in rawg_games: %s", len(all_game_ids))
-    logger.info(
-        "Total games with game details in rawg_game_details: %s", len(existing_set)
-    )
-
-    game_ids: list[int] = [
-        game_id for game_id in all_game_ids if game_id not in existing_set
-    ]
-    # endregion
-
-    # region ------------ Limit requests for testing ------------
-    # SECURITY LOCK: Limit the number of requests for testing
-    # Remove or adjust when running in production
-    # LIMIT_REQUESTS: int = 5  # TEST: Use this in testing
-    LIMIT_REQUESTS: int = len(game_ids)  # PROD: Use this in production
-    game_ids = game_ids[:LIMIT_REQUESTS]
-    # endregion
-
-    total_games: int = len(game_ids)
-    logger.info("Total games to fetch in this run: %s", total_games)
-    # endregion
+    # Missing and stale details (game updated on RAWG after the details were fetched),
+    # computed once on the database and streamed in pages as the workers consume the
+    # ids. The queries run in threads, the event loop is shared with other fetchers
+    logger.info("Querying Supabase for missing and stale game details...")
+    total_games: int = await asyncio.to_thread(refresh_game_details_delta)
 
     if total_games == 0:
         logger.info(
@@ -150,38 +80,53 @@ async def main():
 
         return
 
-    # region ------------ Async fetching and continuous saving ------------
-    timeout = aiohttp.ClientTimeout(total=15)
-    semaphore = asyncio.Semaphore(10)
+    logger.info("Games with missing or stale details: %s", total_games)
+
+    game_ids: AsyncIterator[int] = iterate_in_thread(
+        islice(iter_game_details_delta(), REQUEST_BUDGET)
+    )
+
+    if REQUEST_BUDGET is not None:
+        logger.info("Request budget for this run: %s games", REQUEST_BUDGET)
+    # endregion
 
+    # region ------------ Async fetching and continuous saving ------------
     time_now: str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename: Path = DATA_LOCAL / f"rawg_game_details_response_{time_now}.jsonl"
 
     games_fetched: int = 0
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        tasks: list[asyncio.Task] = [
-            fetch_game_details(session, game_id, semaphore) for game_id in game_ids
-        ]
+    async with RawgClient(API_KEY, timeout=15) as client:
+
+        async def fetch_game_details(game_id: int) -> dict | None:
+            return await client.get_json(ENDPOINT_GAME_DETAILS.format(game_id=game_id))
+
         logger.info("Fetching data and saving continuously to %s...", filename)
 
+        # Ids are fed lazily to a bounded queue, the concurrency controller is the one
+        # limiting the requests in flight
         with open(filename, "a", encoding="utf-8") as f:
-            for coro in asyncio.as_completed(tasks):
-                result = await coro
-
+            async for _, result in run_worker_pool(
+                game_ids,
+                fetch_game_details,
+                workers=client.concurrency.maximum,
+            ):
                 if result is not None:
                     f.write(json.dumps(result, ensure_ascii=False) + "\n")
                     f.flush()
 
                     games_fetched += 1
 
-                    if games_fetched % 10 == 0 or games_fetched == total_games:
+                    if games_fetched % 10 == 0:
                         logger.info(
-                            "Progress: games fetched and saved: %s/%s",
-                            games_fetched,
-                            total_games,
+                            "Progress: games fetched and saved: %s", games_fetched
                         )
 
+    if games_fetched == 0:
+        # Every request failed, leave no empty file behind for the cleaner
+        filename.unlink(missing_ok=True)
+        raise RuntimeError("Every game details request failed, no details saved")
+
     end_time = time.time()
     elapsed_time = end_time - start_time
 
@@ -1,17 +1,30 @@
 """
 File for development of the RAWG fetcher - gets raw game data from the RAWG API
+
+Saves continuously to a .jsonl (JSON Lines) file to prevent data loss and quota waste on
+failures.
+
+Runs in incremental mode by default: games are ordered by most recently updated and the
+fetch stops at the max `updated_on_rawg` already loaded in rawg_games. Set
+RAWG_GAMES_FETCH_MODE=full to fetch the whole date window again. The mark is moved
+back by RAWG_GAMES_OVERLAP_HOURS, so records that changed pages during the last run
+(offset pages over a moving order) are fetched again.
 """
 
-import json
 import os
 import datetime
 import time
 import asyncio
-import aiohttp
-import math
 
 from dotenv import load_dotenv
 from pathlib import Path
+from src.etl.rawg_client import RawgClient
+from src.etl.rawg_pages import (
+    fetch_pages_to_jsonl,
+    fetch_updated_pages_to_jsonl,
+    parse_rawg_datetime,
+)
+from src.utils.supabase_tools import query_max_value
 from src.utils.logger import setup_logger
 
 # region ------------ Load env variables ------------
@@ -25,135 +38,110 @@ logger = setup_logger(__name__)
 
 # region ------------ API access config ------------
 API_KEY: str = os.getenv("RAWG_API_KEY")
-BASE_URL_GAMES: str = f"https://api.rawg.io/api/games"
-HEADERS: dict = {"accept": "application/json"}
+ENDPOINT_GAMES: str = "games"
 PAGE_SIZE: int = 40
 START_DATE: str = "2025-09-01"  # start date in 09/2025 to not expend available requests
+FETCH_MODE: str = os.getenv("RAWG_GAMES_FETCH_MODE", "incremental")  # or "full"
+# Hours fetched again before the high-water mark, duplicates are dropped by the cleaner
+OVERLAP_HOURS: float = float(os.getenv("RAWG_GAMES_OVERLAP_HOURS", 24))
 
 today_date: str = datetime.datetime.now().strftime("%Y-%m-%d")
 base_params: dict = {
-    "key": API_KEY,
     "page_size": PAGE_SIZE,
     "dates": f"{START_DATE},{today_date}",
 }
+# The end date moves every day, so a failed full fetch resumes on the next days too
+checkpoint_params: dict = {"page_size": PAGE_SIZE, "dates_from": START_DATE}
 # endregion
 
 
 # region ------------ Get project path ------------
 PROJECT_ROOT: Path = Path(__file__).parent.parent.parent.parent
 DATA_LOCAL: Path = PROJECT_ROOT / "data_local" / "raw" / "rawg" / "games"
-DATA_LOCAL.mkdir(parents=True, exist_ok=True)
 # endregion
 
 
-async def fetch_page(
-    session: aiohttp.ClientSession,
-    page: int,
-    semaphore: asyncio.Semaphore,
-    max_retries: int = 3,
-) -> list[dict]:
-    """
-    Fetches specific page with concurrency limit, retries, and exponential backoff.
-    """
-    params: dict = base_params.copy()
-    params["page"] = page
-
-    async with semaphore:
-        for attempt in range(max_retries):
-            try:
-                async with session.get(
-                    BASE_URL_GAMES, headers=HEADERS, params=params
-                ) as response:
-                    response.raise_for_status()
-                    data: dict = await response.json()
-                    logger.info("Successfully fetched page %s", page)
-                    return data.get("results", [])
-
-            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
-                logger.warning(
-                    "Attempt %s/%s failed for page %s: %s",
-                    attempt + 1,
-                    max_retries,
-                    page,
-                    e,
-                )
-                if attempt == max_retries - 1:
-                    logger.error(
-                        "----- MAX RETRIES REACHED - FINAL FAILURE FOR PAGE %s -----",
-                        page,
-                    )
-                    return []
-                sleep_time = 2 ** (attempt + 1)
-                logger.info("Retrying page %s in %s seconds...", page, sleep_time)
-                await asyncio.sleep(sleep_time)
-
-
 async def main():
     start_time = time.time()
     logger.info(
         "----- STARTED FETCHER ROUTINE AT %s -----",
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     )
-    timeout = aiohttp.ClientTimeout(total=30)
-    semaphore = asyncio.Semaphore(5)
 
-    all_results: list = []
+    DATA_LOCAL.mkdir(parents=True, exist_ok=True)
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        logger.info("Fetching first page to determine total count...")
-
-        try:
-            params_p1 = base_params.copy()
-            params_p1["page"] = 1
-            async with session.get(
-                BASE_URL_GAMES, headers=HEADERS, params=params_p1
-            ) as response:
-                response.raise_for_status()
-                first_page_data: dict = await response.json()
-
-                total_games: int = first_page_data.get("count")
-                first_page_results: list = first_page_data.get("results", [])
-                all_results.extend(first_page_results)
-
-                logger.info("Total games for this query: %s", total_games)
+    time_now: str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    filename: Path = DATA_LOCAL / f"rawg_games_response_{time_now}.jsonl"
+    logger.info("Fetching data and saving continuously to %s...", filename)
 
-        except Exception as e:
-            logger.error("Failed to fetch inital page. Aborting process. Error: %s", e)
-            return
+    # region ------------ Get high-water mark ------------
+    high_water_mark: datetime.datetime | None = None
 
-        if total_games > PAGE_SIZE:
-            total_pages: int = math.ceil(total_games / PAGE_SIZE)
-            logger.info("Total pages to fetch: %s", total_pages)
+    if FETCH_MODE == "incremental":
+        # Blocking query, run in a thread so the other fetchers on the loop go on
+        max_updated: str | None = await asyncio.to_thread(
+            query_max_value, "rawg_games", "updated_on_rawg"
+        )
 
-            tasks: list = []
-            for page in range(2, total_pages + 1):
-                tasks.append(fetch_page(session, page, semaphore))
+        if max_updated is None:
+            logger.info("No high-water mark found in rawg_games, running full fetch...")
+        else:
+            high_water_mark = parse_rawg_datetime(max_updated) - datetime.timedelta(
+                hours=OVERLAP_HOURS
+            )
+            logger.info("Fetching games updated since %s...", high_water_mark)
+    # endregion
+
+    async with RawgClient(API_KEY) as client:
+        if high_water_mark is not None:
+            records_saved: int | None = await fetch_updated_pages_to_jsonl(
+                client=client,
+                endpoint=ENDPOINT_GAMES,
+                params=base_params,
+                high_water_mark=high_water_mark,
+                filename=filename,
+            )
+
+            # The partial file was deleted, the mark stays where it is for the next run
+            if records_saved is None:
+                raise RuntimeError(
+                    "Incremental games fetch failed, no games saved for the cleaner"
+                )
 
-            page_results = await asyncio.gather(*tasks)
+        else:
+            fetch_result: tuple[Path, int] | None = await fetch_pages_to_jsonl(
+                client=client,
+                endpoint=ENDPOINT_GAMES,
+                params=base_params,
+                page_size=PAGE_SIZE,
+                filename=filename,
+                checkpoint_params=checkpoint_params,
+            )
+
+            # The first page failed, fail the stage like the incremental fetch
+            if fetch_result is None:
+                raise RuntimeError(
+                    "Full games fetch failed, no games saved for the cleaner"
+                )
 
-            for result_list in page_results:
-                all_results.extend(result_list)
+            filename, records_saved = fetch_result
 
-        else:
-            logger.info("Only one page of results found.")
+    # The fetch deleted the empty file, a resumed file keeps its earlier pages
+    if records_saved == 0:
+        logger.info("----- ALL GAMES ARE UP TO DATE! Nothing new to save. -----")
+        return
 
-    # region ------------ Save data to file ------------
+    # region ------------ Log results ------------
     end_time = time.time()
     elapsed_time = end_time - start_time
 
-    time_now: str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename: str = DATA_LOCAL / f"rawg_games_response_{time_now}.json"
-
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(all_results, f, ensure_ascii=False, indent=2)
-
     logger.info("Process finished!")
     logger.info(
         "Fetched %s games between %s!",
-        len(all_results),
+        records_saved,
         f"from {START_DATE} to {today_date}",
     )
-    logger.info("Saved RAWG response to %s", filename)
+    logger.info("Saved JSON Lines RAWG response to %s", filename)
     logger.info(
         "Elapsed time: seconds - %.2f  / minutes - %.2f / hours - %.2f",
         elapsed_time,
@@ -0,0 +1,153 @@
+"""
+File to handle the processed-file ledger of the cleaners - records every raw file
+already loaded (name, size, hash, row count, processed at), so a cleaner processes all
+the files fetched since its last run instead of only the latest one.
+"""
+
+import os
+import json
+import hashlib
+import datetime
+
+from pathlib import Path
+from src.utils.logger import setup_logger
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ Get project path ------------
+PROJECT_ROOT: Path = Path(__file__).parent.parent.parent
+LEDGERS_DIR: Path = PROJECT_ROOT / "data_local" / "ledgers" / "rawg"
+
+# "all" processes every file not in the ledger, "latest" only the most recent file
+CLEANER_MODE: str = os.getenv("RAWG_CLEANER_MODE", "all")
+# endregion
+
+
+# region ------------ File fingerprint ------------
+def file_fingerprint(path: Path) -> tuple[str, int]:
+    """
+    Reads a file once to get its sha256 hash and its number of lines (the records of
+    a JSON Lines file).
+
+    Args:
+        path (Path): The file to read.
+
+    Returns:
+        tuple[str, int]: The hex hash and the number of lines
+    """
+    sha256 = hashlib.sha256()
+    row_count: int = 0
+
+    with open(path, "rb") as f:
+        for line in f:
+            sha256.update(line)
+            row_count += 1
+
+    return sha256.hexdigest(), row_count
+
+
+# endregion
+
+
+# region ------------ Processed file ledger ------------
+class ProcessedFileLedger:
+    """
+    Ledger on disk of the raw files already loaded by a cleaner. A file is new if its
+    name is not in the ledger, or if its size or hash changed since it was processed
+    (e.g. a resumed fetch appended pages to it).
+
+    Args:
+        dataset (str): The dataset of the cleaner, e.g. "games".
+    """
+
+    def __init__(self, dataset: str):
+        self.dataset: str = dataset
+        self.path: Path = LEDGERS_DIR / f"{dataset}.json"
+        self.entries: dict[str, dict] = {}
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def is_processed(self, path: Path) -> bool:
+        """
+        True if the file was processed and did not change since.
+        """
+        entry: dict | None = self.entries.get(Path(path).name)
+
+        if entry is None or entry["size"] != os.path.getsize(path):
+            return False
+
+        return entry["sha256"] == file_fingerprint(path)[0]
+
+    def files_to_process(
+        self, directory: Path, suffix: str = ".jsonl", mode: str = CLEANER_MODE
+    ) -> list[Path]:
+        """
+        Lists the raw files of a directory to process, oldest first.
+
+        Args:
+            directory (Path): The directory with the raw files.
+            suffix (str, optional): Extension of the raw files. Defaults to ".jsonl".
+            mode (str, optional): "all" for every file not processed yet, "latest" for
+                the most recent file even if it was processed. Defaults to
+                RAWG_CLEANER_MODE.
+
+        Returns:
+            list[Path]: The files, sorted by modification time
+        """
+        files: list[Path] = sorted(
+            (Path(directory) / f for f in os.listdir(directory) if f.endswith(suffix)),
+            key=os.path.getmtime,
+        )
+
+        if mode == "latest":
+            return files[-1:]
+
+        skipped: int = 0
+        new_files: list[Path] = []
+        for path in files:
+            if self.is_processed(path):
+                skipped += 1
+            else:
+                new_files.append(path)
+
+        if skipped:
+            logger.info("Skipped %s %s files already processed", skipped, self.dataset)
+
+        return new_files
+
+    def record(self, files: list[Path]):
+        """
+        Records files as processed. Call it only after their data is loaded.
+
+        Args:
+            files (list[Path]): The files loaded.
+        """
+        processed_at: str = datetime.datetime.now().isoformat()
+
+        for path in files:
+            sha256, row_count = file_fingerprint(path)
+            self.entries[Path(path).name] = {
+                "size": os.path.getsize(path),
+                "sha256": sha256,
+                "row_count": row_count,
+                "processed_at": processed_at,
+            }
+
+        self._save()
+
+    def _save(self):
+        LEDGERS_DIR.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file and replace, so a crash never leaves a broken ledger
+        temp_path: Path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+# endregion
@@ -0,0 +1,263 @@
+"""
+File to handle the pipeline runner - declares the dependencies between the fetch and
+clean stages and runs every stage as soon as its dependencies are done, so independent
+stages (e.g. tags and platforms) run at the same time and the wall-clock time is the
+critical path (games -> game details).
+
+Fetchers run concurrently on the asyncio event loop and share one HTTP session, their
+blocking supabase queries run in threads (asyncio.to_thread) so they never stall the
+other fetchers.
+Cleaners run in a process pool since they are CPU bound (Polars), or in threads of
+the same process with `processes=False` (see the `python -m src.etl` CLI).
+
+Usage:
+    python -m src.etl.pipeline                      # every stage
+    python -m src.etl.pipeline fetch_games clean_games
+"""
+
+import sys
+import time
+import asyncio
+import datetime
+import importlib
+import multiprocessing
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from src.etl.rawg_client import shared_session
+from src.utils.logger import setup_logger
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ Stages ------------
+class Stage:
+    """
+    A fetch or clean stage of the pipeline, run by the `main` function of its module.
+
+    Args:
+        name (str): Unique name of the stage, e.g. "fetch_games".
+        module (str): The module with the main function of the stage.
+        kind (str): "fetch" (async main, run on the event loop) or "clean" (sync
+            main, run in the process pool).
+        depends_on (tuple[str, ...], optional): Stages that must succeed first.
+    """
+
+    def __init__(
+        self, name: str, module: str, kind: str, depends_on: tuple[str, ...] = ()
+    ):
+        self.name: str = name
+        self.module: str = module
+        self.kind: str = kind
+        self.depends_on: tuple[str, ...] = depends_on
+
+
+# In dependency order. The details fetchers read the delta from the tables loaded by
+# the games and tags cleaners.
+STAGES: list[Stage] = [
+    Stage("fetch_games", "src.etl.fetchers.rawg_fetcher_games", "fetch"),
+    Stage(
+        "clean_games",
+        "src.etl.cleaners.rawg_cleaner_games",
+        "clean",
+        depends_on=("fetch_games",),
+    ),
+    Stage(
+        "fetch_game_details",
+        "src.etl.fetchers.rawg_fetcher_game_details",
+        "fetch",
+        depends_on=("clean_games",),
+    ),
+    Stage(
+        "clean_game_details",
+        "src.etl.cleaners.rawg_cleaner_game_details",
+        "clean",
+        depends_on=("fetch_game_details",),
+    ),
+    Stage("fetch_tags", "src.etl.fetchers.rawg_fetcher_tags", "fetch"),
+    Stage(
+        "clean_tags",
+        "src.etl.cleaners.rawg_cleaner_tags",
+        "clean",
+        depends_on=("fetch_tags",),
+    ),
+    Stage(
+        "fetch_tag_details",
+        "src.etl.fetchers.rawg_fetcher_tag_details",
+        "fetch",
+        depends_on=("clean_tags",),
+    ),
+    Stage(
+        "clean_tag_details",
+        "src.etl.cleaners.rawg_cleaner_tag_details",
+        "clean",
+        depends_on=("fetch_tag_details",),
+    ),
+    Stage("fetch_platforms", "src.etl.fetchers.rawg_fetcher_platforms", "fetch"),
+    Stage(
+        "clean_platforms",
+        "src.etl.cleaners.rawg_cleaner_platforms",
+        "clean",
+        depends_on=("fetch_platforms",),
+    ),
+    Stage(
+        "fetch_parent_platforms",
+        "src.etl.fetchers.rawg_fetcher_parent_platforms",
+        "fetch",
+    ),
+    Stage(
+        "clean_parent_platforms",
+        "src.etl.cleaners.rawg_cleaner_parent_platforms",
+        "clean",
+        depends_on=("fetch_parent_platforms",),
+    ),
+]
+# endregion
+
+
+# region ------------ Run stages ------------
+def _run_cleaner(module: str):
+    """
+    Runs the main function of a cleaner module, called in a worker process or thread.
+    """
+    importlib.import_module(module).main()
+
+
+async def _run_stage(stage: Stage, executor: Executor):
+    """
+    Runs one stage: fetchers are awaited on the event loop, cleaners are sent to the
+    executor.
+    """
+    if stage.kind == "fetch":
+        await importlib.import_module(stage.module).main()
+    else:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, _run_cleaner, stage.module)
+
+
+async def run_pipeline(
+    stage_names: list[str] | None = None, max_cleaners: int = 3, processes: bool = True
+) -> dict[str, bool]:
+    """
+    Runs the selected stages, each one as soon as its dependencies succeeded. When a
+    stage fails, the stages depending on it are skipped and the others go on.
+
+    Dependencies that are not selected are considered done, e.g. running only
+    "fetch_game_details" uses the games already in the database.
+
+    Args:
+        stage_names (list[str], optional): The stages to run. Defaults to all.
+        max_cleaners (int, optional): Max cleaners running at the same time.
+            Defaults to 3.
+        processes (bool, optional): Run the cleaners in a process pool, or in threads
+            of this process (Polars releases the GIL) to skip the startup of a new
+            interpreter per worker. Defaults to True.
+
+    Returns:
+        dict[str, bool]: Whether each selected stage succeeded
+    """
+    selected: list[Stage] = [
+        stage for stage in STAGES if stage_names is None or stage.name in stage_names
+    ]
+
+    unknown: set[str] = set(stage_names or []) - {stage.name for stage in STAGES}
+    if unknown:
+        raise ValueError(
+            f"Unknown stages: {sorted(unknown)}. "
+            f"Available stages: {[stage.name for stage in STAGES]}"
+        )
+
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run_when_ready(stage: Stage, executor: Executor) -> bool:
+        for dependency in stage.depends_on:
+            if dependency in tasks and not await tasks[dependency]:
+                logger.warning(
+                    "Skipping %s: dependency %s failed", stage.name, dependency
+                )
+                return False
+
+        start_time = time.time()
+        logger.info("----- STAGE %s STARTED -----", stage.name)
+
+        try:
+            await _run_stage(stage, executor)
+        except Exception:
+            logger.exception("----- STAGE %s FAILED -----", stage.name)
+            return False
+
+        logger.info(
+            "----- STAGE %s DONE in %.2f seconds -----",
+            stage.name,
+            time.time() - start_time,
+        )
+        return True
+
+    if processes:
+        # spawn: the workers do not inherit the event loop and the open sessions
+        executor: Executor = ProcessPoolExecutor(
+            max_workers=max_cleaners, mp_context=multiprocessing.get_context("spawn")
+        )
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_cleaners)
+
+    async with shared_session():
+        with executor:
+            for stage in selected:
+                tasks[stage.name] = asyncio.create_task(
+                    run_when_ready(stage, executor)
+                )
+
+            results: list[bool] = await asyncio.gather(*tasks.values())
+
+    return dict(zip(tasks, results))
+
+
+# endregion
+
+
+# region ------------ Main ------------
+def main(stage_names: list[str] | None = None, processes: bool = True):
+    """
+    Runs the pipeline, logs the elapsed time and exits with an error if a stage
+    failed or was skipped.
+
+    Args:
+        stage_names (list[str], optional): The stages to run. Defaults to all.
+        processes (bool, optional): Run the cleaners in a process pool. Defaults to
+            True.
+    """
+    start_time = time.time()
+    logger.info(
+        "----- STARTED PIPELINE AT %s -----",
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+    results: dict[str, bool] = asyncio.run(
+        run_pipeline(stage_names, processes=processes)
+    )
+
+    failed: list[str] = [name for name, succeeded in results.items() if not succeeded]
+    elapsed_time = time.time() - start_time
+
+    logger.info(
+        "Elapsed time: seconds - %.2f  / minutes - %.2f / hours - %.2f",
+        elapsed_time,
+        elapsed_time / 60,
+        elapsed_time / 3600,
+    )
+    logger.info(
+        "----- ENDED PIPELINE AT %s -----",
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+    if failed:
+        logger.error("----- FAILED OR SKIPPED STAGES: %s -----", failed)
+        sys.exit(1)
+
+
+# endregion
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
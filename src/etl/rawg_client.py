@@ -0,0 +1,413 @@
+"""
+File to handle the shared RAWG API client - wraps a single aiohttp session and a
+requests-per-second token bucket so every fetcher runs at the real API rate limit.
+
+Concurrency is controlled by an AIMD (additive increase / multiplicative decrease)
+controller that grows while the API is healthy and backs off on 429/5xx responses.
+"""
+
+import os
+import time
+import asyncio
+import aiohttp
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from src.utils.logger import setup_logger
+
+# region ------------ Load env variables ------------
+load_dotenv()
+# endregion
+
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ API access config ------------
+BASE_URL: str = "https://api.rawg.io/api"
+HEADERS: dict = {"accept": "application/json"}
+
+# Requests per second allowed by the API key, tune it with the env variable
+REQUESTS_PER_SECOND: float = float(os.getenv("RAWG_REQUESTS_PER_SECOND", 5))
+# Bounds of the adaptive concurrency, it starts at the initial value on every run
+INITIAL_CONCURRENCY: int = int(os.getenv("RAWG_INITIAL_CONCURRENCY", 5))
+MAX_CONCURRENCY: int = int(os.getenv("RAWG_MAX_CONCURRENCY", 50))
+
+# Status codes that mean the API is overloaded and the request can be retried
+RETRY_STATUSES: set[int] = {429, 500, 502, 503, 504}
+# endregion
+
+
+# region ------------ Token bucket ------------
+class TokenBucket:
+    """
+    Token bucket rate limiter for asyncio. Tokens are refilled continuously at `rate`
+    tokens per second up to `capacity`, and each request consumes one token.
+
+    Args:
+        rate (float): Tokens added per second (requests per second).
+        capacity (float, optional): Max tokens stored, allows short bursts. Defaults to
+            the rate (one second of burst), at least 1 so rates below 1 request per
+            second still reach a full token.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError(f"The rate of the token bucket must be positive: {rate}")
+
+        self.rate: float = rate
+        self.capacity: float = max(1.0, capacity or rate)
+        self._tokens: float = self.capacity
+        self._updated_at: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now: float = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self):
+        """
+        Waits until a token is available and consumes it. Waiters are served in order
+        because the lock is held while sleeping.
+        """
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def pause(self, seconds: float):
+        """
+        Empties the bucket so no request is sent for the next `seconds`, used when the
+        API answers with a Retry-After header.
+
+        Args:
+            seconds (float): Time to wait before the next request.
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+# One bucket per API key, so every client using the same key shares the rate limit
+_BUCKETS: dict[str, TokenBucket] = {}
+
+
+def get_bucket(api_key: str, rate: float = REQUESTS_PER_SECOND) -> TokenBucket:
+    """
+    Returns the token bucket shared by all the clients of an API key, creating it on
+    first use.
+
+    Args:
+        api_key (str): The RAWG API key.
+        rate (float, optional): Requests per second. Defaults to REQUESTS_PER_SECOND.
+
+    Returns:
+        TokenBucket: The shared token bucket
+    """
+    if api_key not in _BUCKETS:
+        _BUCKETS[api_key] = TokenBucket(rate=rate)
+    return _BUCKETS[api_key]
+
+
+def _parse_retry_after(headers) -> float | None:
+    """
+    Reads the Retry-After header, only the delay in seconds format is supported.
+
+    Args:
+        headers (Mapping): The response headers.
+
+    Returns:
+        float | None: Seconds to wait, or None if the header is missing or invalid
+    """
+    try:
+        return float(headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+# endregion
+
+
+# region ------------ Adaptive concurrency ------------
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit for asyncio. The limit grows by one after a full window of
+    successful requests with stable latency, and is cut by `decrease_factor` when the
+    API answers with 429/5xx. A latency spike stops the growth without cutting it.
+
+    Args:
+        initial (int, optional): Starting limit. Defaults to INITIAL_CONCURRENCY.
+        minimum (int, optional): Lowest limit allowed. Defaults to 1.
+        maximum (int, optional): Highest limit allowed. Defaults to MAX_CONCURRENCY.
+        decrease_factor (float, optional): Multiplier applied on overload. Defaults
+            to 0.5.
+        latency_tolerance (float, optional): How many times above the baseline latency
+            a response can be and still count as stable. Defaults to 2.0.
+    """
+
+    def __init__(
+        self,
+        initial: int = INITIAL_CONCURRENCY,
+        minimum: int = 1,
+        maximum: int = MAX_CONCURRENCY,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        self.minimum: int = minimum
+        self.maximum: int = maximum
+        self.decrease_factor: float = decrease_factor
+        self.latency_tolerance: float = latency_tolerance
+        self.limit: float = float(min(max(initial, minimum), maximum))
+
+        self._in_flight: int = 0
+        self._successes: int = 0
+        self._baseline_latency: float | None = None
+        self._last_decrease: float = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        """
+        Waits until the number of requests in flight is under the current limit.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def release(self):
+        """
+        Frees a slot and wakes up the waiters, the limit may have changed.
+        """
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self, latency: float):
+        """
+        Registers a successful request. After `limit` stable successes in a row the
+        limit grows by one (additive increase).
+
+        Args:
+            latency (float): Response time of the request in seconds.
+        """
+        if self._baseline_latency is None:
+            self._baseline_latency = latency
+
+        if latency > self._baseline_latency * self.latency_tolerance:
+            # Latency is going up, the API is getting saturated: hold the limit
+            self._successes = 0
+            return
+
+        # Moving average of the healthy latency
+        self._baseline_latency = 0.9 * self._baseline_latency + 0.1 * latency
+        self._successes += 1
+
+        if self._successes >= int(self.limit) and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+            logger.debug("Concurrency increased to %s", int(self.limit))
+
+    def record_overload(self):
+        """
+        Registers a 429/5xx response and cuts the limit (multiplicative decrease).
+        Requests that were already in flight fail together, so only one cut is applied
+        per latency window.
+        """
+        now: float = time.monotonic()
+        self._successes = 0
+
+        if now - self._last_decrease < (self._baseline_latency or 1.0):
+            return
+
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        logger.info("API overloaded, concurrency decreased to %s", int(self.limit))
+
+
+# endregion
+
+
+# region ------------ Shared session ------------
+# Session used by every RawgClient while shared_session is open
+_SHARED_SESSION: aiohttp.ClientSession | None = None
+
+
+@asynccontextmanager
+async def shared_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Opens one aiohttp session shared by every RawgClient created inside the block, so
+    the stages of a pipeline run reuse the same connection pool (and TLS connections)
+    instead of opening a session per fetcher.
+
+    Usage:
+        async with shared_session():
+            await fetcher_games.main()
+            await fetcher_tags.main()
+    """
+    global _SHARED_SESSION
+
+    if _SHARED_SESSION is not None:
+        yield _SHARED_SESSION
+        return
+
+    _SHARED_SESSION = aiohttp.ClientSession(
+        headers=HEADERS, connector=aiohttp.TCPConnector(limit=MAX_CONCURRENCY * 2)
+    )
+    try:
+        yield _SHARED_SESSION
+    finally:
+        await _SHARED_SESSION.close()
+        _SHARED_SESSION = None
+
+
+# endregion
+
+
+# region ------------ RAWG client ------------
+class RawgClient:
+    """
+    Async client for the RAWG API. Use it as an async context manager:
+
+        async with RawgClient(api_key) as client:
+            data = await client.get_json("games", params={"page": 1})
+
+    Inside a shared_session block, the client uses the shared session and leaves it
+    open on exit.
+
+    Args:
+        api_key (str): The RAWG API key.
+        requests_per_second (float, optional): Rate limit of the key. Defaults to
+            REQUESTS_PER_SECOND.
+        timeout (int, optional): Total timeout per request in seconds. Defaults to 30.
+        max_retries (int, optional): The maximum number of attempts. Defaults to 3.
+        concurrency (AdaptiveConcurrency, optional): The concurrency controller.
+            Defaults to a new controller with the env bounds.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        timeout: int = 30,
+        max_retries: int = 3,
+        concurrency: AdaptiveConcurrency | None = None,
+    ):
+        self.api_key: str = api_key
+        self.max_retries: int = max_retries
+        self.concurrency: AdaptiveConcurrency = concurrency or AdaptiveConcurrency()
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._bucket: TokenBucket = get_bucket(api_key, requests_per_second)
+        self._session: aiohttp.ClientSession | None = None
+        self._owns_session: bool = False
+
+    async def __aenter__(self) -> "RawgClient":
+        if _SHARED_SESSION is not None:
+            self._session = _SHARED_SESSION
+            self._owns_session = False
+        else:
+            self._session = aiohttp.ClientSession(
+                headers=HEADERS,
+                connector=aiohttp.TCPConnector(limit=self.concurrency.maximum),
+            )
+            self._owns_session = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    async def get_json(self, endpoint: str, params: dict | None = None) -> dict | None:
+        """
+        Requests an endpoint of the API with rate limit, retries, and exponential
+        backoff.
+
+        Args:
+            endpoint (str): The endpoint after the base url, e.g. "games/3498".
+            params (dict, optional): Query params, the API key is added automatically.
+
+        Returns:
+            dict | None: The JSON response, or None if all the attempts failed
+        """
+        url: str = f"{BASE_URL}/{endpoint.strip('/')}"
+        request_params: dict = {"key": self.api_key, **(params or {})}
+
+        for attempt in range(self.max_retries):
+            retry_after: float | None = None
+
+            await self.concurrency.acquire()
+            try:
+                await self._bucket.acquire()
+                request_start: float = time.monotonic()
+
+                async with self._session.get(
+                    url, params=request_params, timeout=self._timeout
+                ) as response:
+                    if response.status in RETRY_STATUSES:
+                        self.concurrency.record_overload()
+                        retry_after = _parse_retry_after(response.headers)
+                        if retry_after is not None:
+                            self._bucket.pause(retry_after)
+
+                    response.raise_for_status()
+                    data: dict = await response.json()
+
+                self.concurrency.record_success(time.monotonic() - request_start)
+                return data
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.warning(
+                    "Attempt %s/%s failed for %s %s: %s",
+                    attempt + 1,
+                    self.max_retries,
+                    endpoint,
+                    params,
+                    e,
+                )
+                if attempt == self.max_retries - 1:
+                    logger.error(
+                        "----- MAX RETRIES REACHED - FINAL FAILURE FOR %s %s -----",
+                        endpoint,
+                        params,
+                    )
+                    return None
+
+            finally:
+                await self.concurrency.release()
+
+            # Sleep outside the slot, so other requests can use it meanwhile
+            sleep_time = retry_after or 2 ** (attempt + 1)
+            logger.info("Retrying %s in %s seconds...", endpoint, sleep_time)
+            await asyncio.sleep(sleep_time)
+
+    async def get_page(
+        self, endpoint: str, page: int, params: dict | None = None
+    ) -> list[dict]:
+        """
+        Fetches the results of a specific page of a paginated endpoint.
+
+        Args:
+            endpoint (str): The endpoint after the base url, e.g. "games".
+            page (int): The page number to fetch.
+            params (dict, optional): Query params of the paginated query.
+
+        Returns:
+            list[dict]: The results of the page, empty if the page failed
+        """
+        data: dict | None = await self.get_json(
+            endpoint, params={**(params or {}), "page": page}
+        )
+        if data is None:
+            return []
+
+        logger.info("Successfully fetched %s page %s", endpoint, page)
+        return data.get("results", [])
+
+
+# endregion
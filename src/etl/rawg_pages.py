@@ -0,0 +1,256 @@
+"""
+File to handle the paginated list endpoints of the RAWG API - every page is streamed to
+a .jsonl (JSON Lines) file as soon as it arrives, so a failure does not lose the pages
+already fetched and memory does not grow with the result set.
+"""
+
+import json
+import math
+import datetime
+
+from pathlib import Path
+from src.etl.checkpoints import PageCheckpoint, remove_stale_checkpoints
+from src.etl.rawg_client import RawgClient
+from src.etl.worker_pool import run_worker_pool
+from src.utils.logger import setup_logger
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ Write pages ------------
+def write_results(f, results: list[dict]):
+    """
+    Appends the results of a page to an open JSON Lines file, one record per line.
+
+    Args:
+        f: The file opened in text append mode.
+        results (list[dict]): The results of the page.
+    """
+    for result in results:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+# endregion
+
+
+# region ------------ Fetch pages ------------
+async def fetch_pages_to_jsonl(
+    client: RawgClient,
+    endpoint: str,
+    params: dict,
+    page_size: int,
+    filename: Path,
+    resume: bool = True,
+    checkpoint_params: dict | None = None,
+) -> tuple[Path, int] | None:
+    """
+    Fetches all the pages of a paginated endpoint and streams the results to a JSON
+    Lines file. The first page gives the total count, the others are fetched
+    concurrently and written in the order they complete.
+
+    With `resume`, the saved pages are recorded in a checkpoint manifest. If a previous
+    run of the same query failed halfway, only its missing pages are fetched, with the
+    params of that run, and they are appended to its file. Manifests older than
+    RAWG_CHECKPOINT_MAX_AGE_DAYS are dropped and the query starts over.
+
+    Args:
+        client (RawgClient): The open RAWG client.
+        endpoint (str): The endpoint after the base url, e.g. "games".
+        params (dict): Query params of the paginated query, without the page.
+        page_size (int): Results per page, must match params["page_size"].
+        filename (Path): The .jsonl file to append the results to on a new query.
+        resume (bool, optional): Use the checkpoint manifest. Defaults to True.
+        checkpoint_params (dict, optional): Params identifying the query in the
+            checkpoint, without the values that move between runs (e.g. an end date
+            of today). Defaults to params.
+
+    Returns:
+        tuple[Path, int] | None: The file used and the number of records saved in this
+            run, or None if the first page failed. The file is deleted if it is empty
+    """
+    if resume:
+        remove_stale_checkpoints()
+
+    checkpoint: PageCheckpoint = PageCheckpoint(endpoint, params, checkpoint_params)
+    records_saved: int = 0
+
+    if resume and checkpoint.is_resumed:
+        # The pages were numbered on the params of the run that started the query
+        params = checkpoint.params
+        filename = checkpoint.filename
+        logger.info(
+            "Resuming %s query from checkpoint: %s/%s pages already saved in %s",
+            endpoint,
+            len(checkpoint.done_pages),
+            checkpoint.total_pages,
+            filename,
+        )
+        missing_pages: list[int] = checkpoint.missing_pages()
+
+    else:
+        logger.info("Fetching first %s page to determine total count...", endpoint)
+
+        first_page_data: dict | None = await client.get_json(
+            endpoint, params={**params, "page": 1}
+        )
+
+        if first_page_data is None:
+            logger.error("Failed to fetch inital %s page. Aborting process.", endpoint)
+            return None
+
+        total_count: int = first_page_data.get("count")
+        total_pages: int = max(1, math.ceil(total_count / page_size))
+        logger.info("Total %s for this query: %s", endpoint, total_count)
+        logger.info("Total pages to fetch: %s", total_pages)
+
+        first_page_results: list[dict] = first_page_data.get("results", [])
+        with open(filename, "a", encoding="utf-8") as f:
+            write_results(f, first_page_results)
+        records_saved += len(first_page_results)
+
+        if resume:
+            checkpoint.start(filename=filename, total_pages=total_pages)
+            checkpoint.mark_done(1)
+
+        missing_pages = list(range(2, total_pages + 1))
+
+    async def fetch_page(page: int) -> dict | None:
+        return await client.get_json(endpoint, params={**params, "page": page})
+
+    failed_pages: int = 0
+
+    with open(filename, "a", encoding="utf-8") as f:
+        async for page, page_data in run_worker_pool(
+            missing_pages,
+            fetch_page,
+            workers=client.concurrency.maximum,
+        ):
+            if page_data is None:
+                failed_pages += 1
+                continue
+
+            page_results: list[dict] = page_data.get("results", [])
+            write_results(f, page_results)
+            records_saved += len(page_results)
+            logger.info("Successfully fetched %s page %s", endpoint, page)
+
+            if resume:
+                checkpoint.mark_done(page)
+
+    if failed_pages:
+        logger.warning(
+            "%s %s pages failed, rerun the fetcher to fetch only the missing pages",
+            failed_pages,
+            endpoint,
+        )
+    elif resume:
+        checkpoint.complete()
+
+    # An empty query, or a resumed run whose pages all failed: no empty file for the
+    # cleaners and the ledger
+    if filename.stat().st_size == 0:
+        filename.unlink()
+
+    return filename, records_saved
+
+
+# endregion
+
+
+# region ------------ Fetch updated pages ------------
+def parse_rawg_datetime(value: str) -> datetime.datetime:
+    """
+    Parses a RAWG or database timestamp to a naive datetime, so both can be compared.
+
+    Args:
+        value (str): ISO timestamp, e.g. "2025-09-18T14:27:54" or with an offset.
+
+    Returns:
+        datetime.datetime: The naive datetime
+    """
+    return datetime.datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+async def fetch_updated_pages_to_jsonl(
+    client: RawgClient,
+    endpoint: str,
+    params: dict,
+    high_water_mark: datetime.datetime,
+    filename: Path,
+    updated_field: str = "updated",
+) -> int | None:
+    """
+    Fetches the pages of a paginated endpoint ordered by most recently updated and
+    streams the results to a JSON Lines file, stopping at the first record older than
+    the high-water mark. Pages are fetched in sequence since the stop point is only
+    known after each page.
+
+    Records updated exactly at the mark are fetched again, so nothing is lost if more
+    than one record shares the last loaded timestamp.
+
+    If a page fails the file is deleted and None is returned: the pages saved are the
+    most recent ones, loading them would move the high-water mark past the records of
+    the pages never fetched.
+
+    Args:
+        client (RawgClient): The open RAWG client.
+        endpoint (str): The endpoint after the base url, e.g. "games".
+        params (dict): Query params of the paginated query, without page and ordering.
+        high_water_mark (datetime.datetime): Max updated timestamp already loaded.
+        filename (Path): The .jsonl file to append the results to.
+        updated_field (str, optional): The updated field of the records. Defaults to
+            "updated".
+
+    Returns:
+        int | None: Number of records saved, or None if a page failed. The file is
+            deleted if nothing was saved
+    """
+    records_saved: int = 0
+    page: int = 1
+
+    with open(filename, "a", encoding="utf-8") as f:
+        while True:
+            page_data: dict | None = await client.get_json(
+                endpoint,
+                params={**params, "ordering": f"-{updated_field}", "page": page},
+            )
+
+            if page_data is None:
+                logger.error("Failed to fetch %s page %s. Aborting.", endpoint, page)
+                break
+
+            page_results: list[dict] = page_data.get("results", [])
+            new_results: list[dict] = [
+                result
+                for result in page_results
+                if not result.get(updated_field)
+                or parse_rawg_datetime(result[updated_field]) >= high_water_mark
+            ]
+
+            write_results(f, new_results)
+            records_saved += len(new_results)
+            logger.info(
+                "Fetched %s page %s: %s records updated since %s",
+                endpoint,
+                page,
+                len(new_results),
+                high_water_mark,
+            )
+
+            # Reached records older than the mark, or the last page
+            if len(new_results) < len(page_results) or not page_data.get("next"):
+                break
+
+            page += 1
+
+    # A failed page discards the run, an empty one leaves no file for the cleaner
+    if page_data is None or records_saved == 0:
+        filename.unlink(missing_ok=True)
+
+    return None if page_data is None else records_saved
+
+
+# endregion
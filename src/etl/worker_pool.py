@@ -0,0 +1,148 @@
+"""
+File to handle the bounded producer/consumer worker pool used by the fetchers - items
+are fed lazily into a bounded asyncio.Queue and consumed by N workers, so memory stays
+flat no matter how many items there are.
+"""
+
+import asyncio
+
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+)
+from itertools import islice
+from typing import Any
+from src.utils.logger import setup_logger
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# Marks the end of the items for a worker, and the end of a worker for the consumer
+_DONE = object()
+
+
+# region ------------ Worker pool ------------
+async def run_worker_pool(
+    items: Iterable[Any] | AsyncIterable[Any],
+    handler: Callable[[Any], Awaitable[Any]],
+    workers: int,
+    queue_size: int | None = None,
+) -> AsyncIterator[tuple[Any, Any]]:
+    """
+    Runs `handler` for every item with `workers` concurrent workers and yields the
+    results as they complete. Only `queue_size` items are pending at any time, the
+    iterable is consumed lazily.
+
+    Usage:
+        async for game_id, result in run_worker_pool(game_ids, fetch, workers=10):
+            ...
+
+    Args:
+        items (Iterable | AsyncIterable): The items to process, e.g. a list of ids or
+            the async iterator of iterate_in_thread.
+        handler (Callable): Async function called with each item.
+        workers (int): Number of concurrent workers.
+        queue_size (int, optional): Max items waiting in the queues. Defaults to
+            twice the number of workers.
+
+    Yields:
+        tuple: The item and the result of the handler (None if the handler raised)
+    """
+    queue_size = queue_size or workers * 2
+    items_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    results_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def producer():
+        if isinstance(items, AsyncIterable):
+            async for item in items:
+                await items_queue.put(item)
+        else:
+            for item in items:
+                await items_queue.put(item)
+        for _ in range(workers):
+            await items_queue.put(_DONE)
+
+    async def worker():
+        while True:
+            item = await items_queue.get()
+            if item is _DONE:
+                await results_queue.put(_DONE)
+                return
+
+            try:
+                result = await handler(item)
+            except Exception:
+                logger.exception("Worker failed to process item %s", item)
+                result = None
+
+            await results_queue.put((item, result))
+
+    producer_task: asyncio.Task = asyncio.create_task(producer())
+    worker_tasks: list[asyncio.Task] = [
+        asyncio.create_task(worker()) for _ in range(workers)
+    ]
+
+    try:
+        workers_done: int = 0
+        while workers_done < workers:
+            output = await results_queue.get()
+            if output is _DONE:
+                workers_done += 1
+                continue
+            yield output
+
+    finally:
+        # Stops everything if the consumer exits early or fails
+        producer_task.cancel()
+        for task in worker_tasks:
+            task.cancel()
+        await asyncio.gather(producer_task, *worker_tasks, return_exceptions=True)
+
+
+# endregion
+
+
+# region ------------ Blocking iterables ------------
+async def iterate_in_thread(
+    items: Iterable[Any], chunk_size: int = 1000
+) -> AsyncIterator[Any]:
+    """
+    Iterates a blocking iterable (e.g. a generator paging the database) in a worker
+    thread, `chunk_size` items at a time, so its requests never block the event loop.
+    The next chunk is prefetched while the current one is consumed.
+
+    Args:
+        items (Iterable): The blocking iterable.
+        chunk_size (int, optional): Items pulled per thread call, the page size of
+            the iterable. Defaults to 1000.
+
+    Yields:
+        The items, in order
+    """
+    iterator = iter(items)
+
+    def next_chunk() -> list[Any]:
+        return list(islice(iterator, chunk_size))
+
+    pending: asyncio.Future = asyncio.ensure_future(asyncio.to_thread(next_chunk))
+
+    try:
+        while True:
+            chunk: list[Any] = await pending
+            if not chunk:
+                return
+
+            pending = asyncio.ensure_future(asyncio.to_thread(next_chunk))
+            for item in chunk:
+                yield item
+
+    finally:
+        pending.cancel()
+
+
+# endregion
@@ -86,3 +86,243 @@ PARENT_PLATFORMS_SCHEMA = {
     "platform_id": pl.List(pl.Int64),
     "updated_at": pl.Datetime,
 }
+
+
+# region ------------ RAWG input schemas ------------
+# Complete schemas of the raw RAWG payloads, used by the cleaners to scan the JSON Lines
+# files with no inference. A field that changes type fails the scan instead of being
+# inferred again, and the scans only parse the fields the cleaners select.
+# Objects with dynamic keys (e.g. "reactions") or always null ("user_game") are left
+# out, they are skipped by the scans.
+
+# Nested objects shared by the payloads
+_RAWG_NAMED_ITEM = pl.Struct({"id": pl.Int64, "name": pl.Utf8, "slug": pl.Utf8})
+
+_RAWG_CATALOG_ITEM = pl.Struct(
+    {
+        "id": pl.Int64,
+        "name": pl.Utf8,
+        "slug": pl.Utf8,
+        "games_count": pl.Int64,
+        "image_background": pl.Utf8,
+    }
+)
+
+_RAWG_TAG_ITEM = pl.Struct(
+    {
+        "id": pl.Int64,
+        "name": pl.Utf8,
+        "slug": pl.Utf8,
+        "language": pl.Utf8,
+        "games_count": pl.Int64,
+        "image_background": pl.Utf8,
+    }
+)
+
+_RAWG_GAME_ITEM = pl.Struct(
+    {"id": pl.Int64, "slug": pl.Utf8, "name": pl.Utf8, "added": pl.Int64}
+)
+
+_RAWG_PLATFORM_ITEM = pl.Struct(
+    {
+        "id": pl.Int64,
+        "name": pl.Utf8,
+        "slug": pl.Utf8,
+        "image": pl.Utf8,
+        "year_end": pl.Int64,
+        "year_start": pl.Int64,
+        "games_count": pl.Int64,
+        "image_background": pl.Utf8,
+    }
+)
+
+_RAWG_REQUIREMENTS = pl.Struct({"minimum": pl.Utf8, "recommended": pl.Utf8})
+
+_RAWG_GAME_PLATFORM = pl.Struct(
+    {
+        "platform": _RAWG_PLATFORM_ITEM,
+        "released_at": pl.Utf8,
+        "requirements": _RAWG_REQUIREMENTS,
+        "requirements_en": _RAWG_REQUIREMENTS,
+        "requirements_ru": _RAWG_REQUIREMENTS,
+    }
+)
+
+_RAWG_RATING = pl.Struct(
+    {"id": pl.Int64, "title": pl.Utf8, "count": pl.Int64, "percent": pl.Float64}
+)
+
+_RAWG_ADDED_BY_STATUS = pl.Struct(
+    {
+        "yet": pl.Int64,
+        "owned": pl.Int64,
+        "beaten": pl.Int64,
+        "toplay": pl.Int64,
+        "dropped": pl.Int64,
+        "playing": pl.Int64,
+    }
+)
+
+_RAWG_ESRB_RATING = pl.Struct(
+    {
+        "id": pl.Int64,
+        "name": pl.Utf8,
+        "slug": pl.Utf8,
+        "name_en": pl.Utf8,
+        "name_ru": pl.Utf8,
+    }
+)
+
+_RAWG_STORE_ITEM = pl.Struct(
+    {
+        "id": pl.Int64,
+        "name": pl.Utf8,
+        "slug": pl.Utf8,
+        "domain": pl.Utf8,
+        "games_count": pl.Int64,
+        "image_background": pl.Utf8,
+    }
+)
+
+
+RAWG_GAMES_INPUT_SCHEMA = {
+    "id": pl.Int64,
+    "slug": pl.Utf8,
+    "name": pl.Utf8,
+    "released": pl.Utf8,
+    "tba": pl.Boolean,
+    "background_image": pl.Utf8,
+    "rating": pl.Float64,
+    "rating_top": pl.Int64,
+    "ratings": pl.List(_RAWG_RATING),
+    "ratings_count": pl.Int64,
+    "reviews_text_count": pl.Int64,
+    "added": pl.Int64,
+    "added_by_status": _RAWG_ADDED_BY_STATUS,
+    "metacritic": pl.Int64,
+    "playtime": pl.Int64,
+    "suggestions_count": pl.Int64,
+    "updated": pl.Utf8,
+    "reviews_count": pl.Int64,
+    "saturated_color": pl.Utf8,
+    "dominant_color": pl.Utf8,
+    "platforms": pl.List(_RAWG_GAME_PLATFORM),
+    "parent_platforms": pl.List(pl.Struct({"platform": _RAWG_NAMED_ITEM})),
+    "genres": pl.List(_RAWG_CATALOG_ITEM),
+    "stores": pl.List(
+        pl.Struct({"id": pl.Int64, "url": pl.Utf8, "store": _RAWG_STORE_ITEM})
+    ),
+    "tags": pl.List(_RAWG_TAG_ITEM),
+    "esrb_rating": _RAWG_ESRB_RATING,
+    "short_screenshots": pl.List(pl.Struct({"id": pl.Int64, "image": pl.Utf8})),
+}
+
+
+RAWG_GAME_DETAILS_INPUT_SCHEMA = {
+    "id": pl.Int64,
+    "slug": pl.Utf8,
+    "name": pl.Utf8,
+    "name_original": pl.Utf8,
+    "description": pl.Utf8,
+    "description_raw": pl.Utf8,
+    "metacritic": pl.Int64,
+    "metacritic_platforms": pl.List(
+        pl.Struct(
+            {
+                "metascore": pl.Int64,
+                "url": pl.Utf8,
+                "platform": pl.Struct(
+                    {"platform": pl.Int64, "name": pl.Utf8, "slug": pl.Utf8}
+                ),
+            }
+        )
+    ),
+    "metacritic_url": pl.Utf8,
+    "released": pl.Utf8,
+    "tba": pl.Boolean,
+    "updated": pl.Utf8,
+    "background_image": pl.Utf8,
+    "background_image_additional": pl.Utf8,
+    "website": pl.Utf8,
+    "rating": pl.Float64,
+    "rating_top": pl.Int64,
+    "ratings": pl.List(_RAWG_RATING),
+    "ratings_count": pl.Int64,
+    "added": pl.Int64,
+    "added_by_status": _RAWG_ADDED_BY_STATUS,
+    "playtime": pl.Int64,
+    "screenshots_count": pl.Int64,
+    "movies_count": pl.Int64,
+    "creators_count": pl.Int64,
+    "achievements_count": pl.Int64,
+    "parent_achievements_count": pl.Int64,
+    "reddit_url": pl.Utf8,
+    "reddit_name": pl.Utf8,
+    "reddit_description": pl.Utf8,
+    "reddit_logo": pl.Utf8,
+    "reddit_count": pl.Int64,
+    "twitch_count": pl.Int64,
+    "youtube_count": pl.Int64,
+    "reviews_text_count": pl.Int64,
+    "reviews_count": pl.Int64,
+    "suggestions_count": pl.Int64,
+    "alternative_names": pl.List(pl.Utf8),
+    "parents_count": pl.Int64,
+    "additions_count": pl.Int64,
+    "game_series_count": pl.Int64,
+    "saturated_color": pl.Utf8,
+    "dominant_color": pl.Utf8,
+    "parent_platforms": pl.List(pl.Struct({"platform": _RAWG_NAMED_ITEM})),
+    "platforms": pl.List(_RAWG_GAME_PLATFORM),
+    "stores": pl.List(
+        pl.Struct({"id": pl.Int64, "url": pl.Utf8, "store": _RAWG_STORE_ITEM})
+    ),
+    "developers": pl.List(_RAWG_CATALOG_ITEM),
+    "genres": pl.List(_RAWG_CATALOG_ITEM),
+    "tags": pl.List(_RAWG_TAG_ITEM),
+    "publishers": pl.List(_RAWG_CATALOG_ITEM),
+    "esrb_rating": _RAWG_ESRB_RATING,
+}
+
+
+RAWG_TAGS_INPUT_SCHEMA = {
+    "id": pl.Int64,
+    "name": pl.Utf8,
+    "slug": pl.Utf8,
+    "games_count": pl.Int64,
+    "image_background": pl.Utf8,
+    "language": pl.Utf8,
+    "games": pl.List(_RAWG_GAME_ITEM),
+}
+
+
+RAWG_TAG_DETAILS_INPUT_SCHEMA = {
+    "id": pl.Int64,
+    "name": pl.Utf8,
+    "slug": pl.Utf8,
+    "games_count": pl.Int64,
+    "image_background": pl.Utf8,
+    "description": pl.Utf8,
+}
+
+
+RAWG_PLATFORMS_INPUT_SCHEMA = {
+    "id": pl.Int64,
+    "name": pl.Utf8,
+    "slug": pl.Utf8,
+    "games_count": pl.Int64,
+    "image_background": pl.Utf8,
+    "image": pl.Utf8,
+    "year_start": pl.Int64,
+    "year_end": pl.Int64,
+    "games": pl.List(_RAWG_GAME_ITEM),
+}
+
+
+RAWG_PARENT_PLATFORMS_INPUT_SCHEMA = {
+    "id": pl.Int64,
+    "name": pl.Utf8,
+    "slug": pl.Utf8,
+    "platforms": pl.List(_RAWG_PLATFORM_ITEM),
+}
+# endregion
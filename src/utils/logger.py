@@ -19,7 +19,24 @@ LOGGER_LEVEL: int = int(os.getenv("LOGGER_LEVEL", logging.INFO))
 
 # region ------------ Folder Setup ------------
 LOG_DIR: Path = Path(__file__).parent.parent.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
+# endregion
+
+
+# region ------------ Lazy file handler ------------
+class LazyFileHandler(logging.FileHandler):
+    """
+    File handler that creates the log folder and opens the file only when the first
+    record is written, so setting up a logger at import has no side effect on disk.
+    """
+
+    def __init__(self, filename: Path):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
 # endregion
 
 
@@ -55,7 +72,7 @@ def setup_logger(name: str) -> logging.Logger:
 
         # File handler
         log_file = LOG_DIR / f"{name}.log"
-        fh = logging.FileHandler(log_file)
+        fh = LazyFileHandler(log_file)
         fh.setFormatter(formatter)
         logger.addHandler(fh)
 
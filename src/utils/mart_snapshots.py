@@ -0,0 +1,294 @@
+"""
+File to handle the Parquet snapshots of the dbt marts - after a dbt build every mart of
+public_marts is exported once to a compressed Parquet file, listed in a manifest with
+its etag, so the dashboard loads whole marts with pl.read_parquet instead of pulling
+them row by row as JSON through PostgREST.
+
+The snapshots are written to disk and, with a bucket, uploaded to supabase storage.
+The file names contain the etag (hash of the file), a new file is only read when the
+manifest points to it. Shared by the ETL and the Streamlit app, so the storage
+functions only depend on a client passed by the caller.
+
+Usage:
+    python -m src.etl export                # to disk and MART_SNAPSHOTS_BUCKET
+    python -m src.etl export --local
+"""
+
+import io
+import os
+import json
+import hashlib
+import datetime
+import polars as pl
+
+from pathlib import Path
+from supabase import Client
+from dotenv import load_dotenv
+from src.utils.supabase_readers import read_table
+from src.utils.logger import setup_logger
+
+# region ------------ Load env variables ------------
+load_dotenv()
+
+PROJECT_ROOT: Path = Path(__file__).parent.parent.parent
+SNAPSHOTS_DIR: Path = PROJECT_ROOT / "data_local" / "snapshots" / "marts"
+
+# Bucket of the snapshots, the export only writes to disk when it is not set
+SNAPSHOTS_BUCKET: str | None = os.getenv("MART_SNAPSHOTS_BUCKET")
+SNAPSHOTS_FOLDER: str = "marts"
+MANIFEST_NAME: str = "manifest.json"
+
+MARTS_SCHEMA: str = "public_marts"
+
+# Marts exported and their unique key, giving the order of the rows
+MARTS: dict[str, str] = {
+    "mart_rawg__games": "game_id",
+    "mart_rawg__kpis": "kpi_id",
+    "mart_rawg__releases_by_games_monthyear": "month_year",
+    "mart_rawg__releases_by_games_platform": "row_id",
+    "mart_rawg__releases_by_gametags_monthyear": "row_id",
+}
+# endregion
+
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ Write snapshots ------------
+def write_snapshot(data: pl.DataFrame, table_name: str, directory: Path) -> dict:
+    """
+    Writes a mart to a zstd compressed Parquet file named after its etag, the first
+    16 characters of the sha256 of the file.
+
+    Args:
+        data (pl.DataFrame): The mart data.
+        table_name (str): The name of the mart.
+        directory (Path): The folder of the snapshots.
+
+    Returns:
+        dict: The manifest entry of the snapshot (file, etag, rows, size)
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+
+    buffer = io.BytesIO()
+    data.write_parquet(buffer, compression="zstd")
+    content: bytes = buffer.getvalue()
+
+    etag: str = hashlib.sha256(content).hexdigest()[:16]
+    file: str = f"{table_name}-{etag}.parquet"
+    (directory / file).write_bytes(content)
+
+    return {"file": file, "etag": etag, "rows": data.height, "size": len(content)}
+
+
+def _write_manifest(manifest: dict, directory: Path):
+    # Write to a temp file and replace, so a reader never sees a half written manifest
+    temp_path: Path = directory / f"{MANIFEST_NAME}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, directory / MANIFEST_NAME)
+
+
+# endregion
+
+
+# region ------------ Storage ------------
+def _upload_snapshots(client: Client, manifest: dict, directory: Path, bucket: str):
+    """
+    Uploads the snapshot files, then the manifest, so the manifest in the bucket never
+    points to a file not uploaded yet. Files of the previous manifest are kept for the
+    readers still using it, older ones are removed.
+    """
+    storage = client.storage.from_(bucket)
+    previous: dict | None = read_manifest(client=client, bucket=bucket)
+
+    for entry in manifest["tables"].values():
+        with open(directory / entry["file"], "rb") as f:
+            storage.upload(
+                f"{SNAPSHOTS_FOLDER}/{entry['file']}",
+                f,
+                file_options={
+                    "content-type": "application/vnd.apache.parquet",
+                    "upsert": "true",
+                },
+            )
+
+    storage.upload(
+        f"{SNAPSHOTS_FOLDER}/{MANIFEST_NAME}",
+        json.dumps(manifest).encode("utf-8"),
+        file_options={
+            "content-type": "application/json",
+            # max-age in seconds, so the manifest is never served from a cache
+            "cache-control": "0",
+            "upsert": "true",
+        },
+    )
+
+    keep: set[str] = {MANIFEST_NAME}
+    for snapshot in (manifest, previous or {"tables": {}}):
+        keep.update(entry["file"] for entry in snapshot["tables"].values())
+
+    stale: list[str] = [
+        f"{SNAPSHOTS_FOLDER}/{item['name']}"
+        for item in storage.list(SNAPSHOTS_FOLDER)
+        if item["name"] not in keep
+    ]
+    if stale:
+        storage.remove(stale)
+        logger.info("Removed %s old snapshots from the bucket %s", len(stale), bucket)
+
+
+# endregion
+
+
+# region ------------ Export marts ------------
+def export_marts(
+    client: Client,
+    marts: dict[str, str] = MARTS,
+    directory: Path = SNAPSHOTS_DIR,
+    bucket: str | None = SNAPSHOTS_BUCKET,
+) -> dict:
+    """
+    Exports every mart to a Parquet snapshot and writes the manifest. Run it after the
+    dbt build, the marts do not change until the next one.
+
+    Args:
+        client (Client): The supabase client.
+        marts (dict[str, str], optional): The marts and their unique key. Defaults to
+            MARTS.
+        directory (Path, optional): The local folder of the snapshots. Defaults to
+            data_local/snapshots/marts.
+        bucket (str, optional): The bucket to upload to. Defaults to
+            MART_SNAPSHOTS_BUCKET, only written to disk if not set.
+
+    Returns:
+        dict: The manifest (version, created_at and the entry of every mart)
+    """
+    tables: dict[str, dict] = {}
+
+    for table_name, key in marts.items():
+        data: pl.DataFrame = read_table(
+            client=client, table_name=table_name, key=key, schema_name=MARTS_SCHEMA
+        )
+        tables[table_name] = write_snapshot(data, table_name, directory)
+        logger.info(
+            "Exported %s rows of %s to %s",
+            data.height,
+            table_name,
+            tables[table_name]["file"],
+        )
+
+    # The version changes only when the content of a mart changed
+    version: str = hashlib.sha256(
+        "".join(tables[name]["etag"] for name in sorted(tables)).encode("utf-8")
+    ).hexdigest()[:16]
+
+    manifest: dict = {
+        "version": version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "tables": tables,
+    }
+
+    if bucket:
+        _upload_snapshots(client, manifest, directory, bucket)
+
+    _write_manifest(manifest, directory)
+    logger.info("Exported marts snapshot version %s", version)
+
+    return manifest
+
+
+# endregion
+
+
+# region ------------ Read snapshots ------------
+def read_manifest(
+    client: Client | None = None,
+    bucket: str | None = None,
+    directory: Path = SNAPSHOTS_DIR,
+) -> dict | None:
+    """
+    Reads the manifest of the snapshots, from the bucket if one is given, else from
+    the local folder.
+
+    Args:
+        client (Client, optional): The supabase client, needed with a bucket.
+        bucket (str, optional): The bucket of the snapshots. Defaults to reading from
+            disk.
+        directory (Path, optional): The local folder of the snapshots.
+
+    Returns:
+        dict | None: The manifest, None if there is no snapshot yet
+    """
+    if bucket:
+        try:
+            content: bytes = client.storage.from_(bucket).download(
+                f"{SNAPSHOTS_FOLDER}/{MANIFEST_NAME}"
+            )
+        except Exception as e:
+            logger.warning("No marts snapshot manifest in %s: %s", bucket, e)
+            return None
+
+        return json.loads(content)
+
+    path: Path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_snapshot(
+    file: str,
+    client: Client | None = None,
+    bucket: str | None = None,
+    directory: Path = SNAPSHOTS_DIR,
+    columns: list[str] | None = None,
+) -> pl.DataFrame:
+    """
+    Reads a mart snapshot listed in the manifest with pl.read_parquet.
+
+    Args:
+        file (str): The file of the manifest entry.
+        client (Client, optional): The supabase client, needed with a bucket.
+        bucket (str, optional): The bucket of the snapshots. Defaults to reading from
+            disk.
+        directory (Path, optional): The local folder of the snapshots.
+        columns (list[str], optional): Columns to read. Defaults to all the columns.
+
+    Returns:
+        pl.DataFrame: The mart data
+    """
+    if bucket:
+        content: bytes = client.storage.from_(bucket).download(
+            f"{SNAPSHOTS_FOLDER}/{file}"
+        )
+        return pl.read_parquet(io.BytesIO(content), columns=columns)
+
+    return pl.read_parquet(Path(directory) / file, columns=columns)
+
+
+# endregion
+
+
+# region ------------ Main ------------
+def main(bucket: str | None = SNAPSHOTS_BUCKET):
+    """
+    Exports the marts with the supabase client of the process.
+
+    Args:
+        bucket (str, optional): The bucket to upload to. Defaults to
+            MART_SNAPSHOTS_BUCKET.
+    """
+    from src.utils.supabase_client import get_supabase
+
+    export_marts(client=get_supabase(), bucket=bucket)
+
+
+# endregion
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+File to handle the bulk loads straight to the Postgres database of supabase - the data
+is streamed with COPY into a staging table and merged with INSERT ... ON CONFLICT, an
+alternative to the PostgREST upserts of update_table for full reloads.
+
+Needs the optional `psycopg` dependency (`uv sync --extra postgres`) and the connection
+string of the database in SUPABASE_DB_URL.
+"""
+
+import os
+import time
+import polars as pl
+
+from dotenv import load_dotenv
+from src.utils.logger import setup_logger
+
+# region ------------ Load env variables ------------
+load_dotenv()
+
+# e.g. postgresql://postgres.<project>:<password>@<host>:5432/postgres
+SUPABASE_DB_URL: str = os.getenv("SUPABASE_DB_URL")
+
+# Rows written to CSV at a time while streaming the COPY
+COPY_BATCH_ROWS: int = int(os.getenv("SUPABASE_COPY_BATCH_ROWS", 10_000))
+# endregion
+
+
+# region ------------ Logger setup ------------
+logger = setup_logger(__name__)
+# endregion
+
+
+# region ------------ CSV encoding ------------
+def _array_literal(column: str) -> pl.Expr:
+    """
+    Encodes a list column as Postgres array literals ({"a","b"}), quoting and
+    escaping every element, so COPY parses it into the array column of the table.
+    Null lists stay null, null elements are written as NULL.
+    """
+    element = pl.element().cast(pl.Utf8)
+    escaped = element.str.replace_all("\\", "\\\\", literal=True).str.replace_all(
+        '"', '\\"', literal=True
+    )
+    quoted = (
+        pl.when(element.is_null()).then(pl.lit("NULL")).otherwise('"' + escaped + '"')
+    )
+    return pl.concat_str(
+        pl.lit("{"), pl.col(column).list.eval(quoted).list.join(","), pl.lit("}")
+    ).alias(column)
+
+
+def _to_copy_csv(data: pl.DataFrame) -> str:
+    """
+    Writes a DataFrame as the CSV read by COPY: lists as array literals, nulls as
+    unquoted empty fields and empty strings quoted, dates and datetimes in ISO
+    format, parsed by COPY into the types of the staging table.
+    """
+    list_columns: list[str] = [
+        name for name, dtype in data.schema.items() if isinstance(dtype, pl.List)
+    ]
+    return data.with_columns(map(_array_literal, list_columns)).write_csv(
+        include_header=False
+    )
+
+
+# endregion
+
+
+# region ------------ Merge statement ------------
+def _merge_query(
+    table_name: str,
+    staging_table: str,
+    columns: list[str],
+    keys: list[str],
+    skip_unchanged_column: str | None,
+):
+    """
+    Builds the INSERT ... ON CONFLICT statement that merges the staging table into
+    the table. With `skip_unchanged_column`, rows whose hash did not change are not
+    rewritten.
+    """
+    from psycopg import sql
+
+    update_columns: list[str] = [col for col in columns if col not in keys]
+    target: sql.Identifier = sql.Identifier("public", table_name)
+
+    if update_columns:
+        conflict_action = sql.SQL("do update set {}").format(
+            sql.SQL(", ").join(
+                sql.SQL("{col} = excluded.{col}").format(col=sql.Identifier(col))
+                for col in update_columns
+            )
+        )
+        if skip_unchanged_column:
+            conflict_action += sql.SQL(
+                " where {target}.{col} is distinct from excluded.{col}"
+            ).format(target=target, col=sql.Identifier(skip_unchanged_column))
+    else:
+        conflict_action = sql.SQL("do nothing")
+
+    return sql.SQL(
+        "insert into {target} ({columns}) select {columns} from {staging} "
+        "on conflict ({keys}) {action}"
+    ).format(
+        target=target,
+        columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        staging=sql.Identifier(staging_table),
+        keys=sql.SQL(", ").join(map(sql.Identifier, keys)),
+        action=conflict_action,
+    )
+
+
+# endregion
+
+
+# region ------------ Copy table ------------
+def copy_table(
+    table_name: str,
+    data_to_update: pl.DataFrame,
+    on_conflict: str = "game_id",
+    skip_unchanged_column: str | None = None,
+    batch_rows: int = COPY_BATCH_ROWS,
+    db_url: str | None = None,
+) -> int:
+    """
+    Upserts a DataFrame into a table with COPY: the rows are streamed into a
+    temporary staging table shaped like the table, then merged with one INSERT ...
+    ON CONFLICT. Everything runs in a single transaction, a failure leaves the table
+    untouched.
+
+    Only the columns of the DataFrame are loaded, like the upserts of update_table.
+
+    ARGS:
+        table_name (str): The name of the table to update, in the public schema
+        data_to_update (pl.DataFrame): The data to update the table with
+        on_conflict (str, optional): The unique column(s) of the upsert
+        skip_unchanged_column (str, optional): Hash column compared on conflict,
+            rows with the same hash are left as they are
+        batch_rows (int, optional): Rows written to CSV at a time
+        db_url (str, optional): Connection string. Defaults to SUPABASE_DB_URL.
+
+    Returns:
+        int: Number of rows inserted or updated
+    """
+    try:
+        import psycopg
+        from psycopg import sql
+    except ImportError as e:
+        raise ImportError(
+            "The COPY loader needs psycopg, install it with `uv sync --extra postgres`"
+        ) from e
+
+    db_url = db_url or SUPABASE_DB_URL
+    if not db_url:
+        raise ValueError("SUPABASE_DB_URL is not set, it is needed by the COPY loader")
+
+    start_time = time.time()
+    keys: list[str] = [key.strip() for key in on_conflict.split(",")]
+    columns: list[str] = data_to_update.columns
+    staging_table: str = f"{table_name}_staging"
+
+    with psycopg.connect(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL(
+                    "create temp table {staging} "
+                    "(like {target} including defaults) on commit drop"
+                ).format(
+                    staging=sql.Identifier(staging_table),
+                    target=sql.Identifier("public", table_name),
+                )
+            )
+
+            copy_query = sql.SQL(
+                "copy {staging} ({columns}) from stdin (format csv)"
+            ).format(
+                staging=sql.Identifier(staging_table),
+                columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+            )
+
+            # Streamed as CSV by batch, COPY casts the text to the column types of
+            # the staging table (arrays, dates, timestamps)
+            with cur.copy(copy_query) as copy:
+                for batch in data_to_update.iter_slices(n_rows=batch_rows):
+                    copy.write(_to_copy_csv(batch))
+
+            logger.info(
+                "Copied %s rows into the staging table of %s in %.2f seconds",
+                data_to_update.height,
+                table_name,
+                time.time() - start_time,
+            )
+
+            cur.execute(
+                _merge_query(
+                    table_name, staging_table, columns, keys, skip_unchanged_column
+                )
+            )
+            rows_merged: int = cur.rowcount
+
+    logger.info(
+        "Merged %s rows into %s with COPY (%.2f seconds)",
+        rows_merged,
+        table_name,
+        time.time() - start_time,
+    )
+
+    return rows_merged
+
+
+# endregion
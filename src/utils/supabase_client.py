@@ -1,10 +1,15 @@
 """
 This file handles the connection to the supabase database.
+
+The client is created on the first call of get_supabase and cached, so importing a
+module that uses the database needs no network and every caller in the process shares
+one client.
 """
 
 import os
+import threading
 from dotenv import load_dotenv
-from supabase import create_client
+from supabase import create_client, Client
 
 # region ------------ Load env variables ------------
 load_dotenv()
@@ -15,5 +20,26 @@ load_dotenv()
 SUPABASE_URL: str = os.getenv("SUPABASE_URL")
 SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+_client: Client | None = None
+_client_lock = threading.Lock()
+
+
+def get_supabase() -> Client:
+    """
+    Returns the supabase client of the process, creating it on the first call. Safe to
+    call from the threads of the cleaners, only one client is ever created.
+
+    Returns:
+        Client: The shared supabase client
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    return _client
+
+
 # endregion
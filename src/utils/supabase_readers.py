@@ -0,0 +1,203 @@
+"""
+File to handle the paginated reads of supabase tables - shared by the ETL and the
+Streamlit app, so it only depends on a client passed by the caller.
+"""
+
+import polars as pl
+
+from typing import Any
+from supabase import Client
+
+
+# region ------------ Keyset filter ------------
+def _quote(value: Any) -> str:
+    """
+    Quotes a value for a PostgREST logic filter, so commas, dots and parentheses in
+    strings do not break the filter.
+    """
+    text: str = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset_filter(keys: list[str], last_row: dict) -> str:
+    """
+    Builds the PostgREST "or" filter equivalent to (k1, k2, ...) > (v1, v2, ...) for a
+    composite key, e.g. "k1.gt.v1,and(k1.eq.v1,k2.gt.v2)".
+
+    Args:
+        keys (list[str]): The key columns, in the order of the sort.
+        last_row (dict): The last row of the previous page.
+
+    Returns:
+        str: The filter for the or_ method
+    """
+    conditions: list[str] = []
+
+    for position, key in enumerate(keys):
+        equals: list[str] = [
+            f"{previous}.eq.{_quote(last_row[previous])}"
+            for previous in keys[:position]
+        ]
+        greater: str = f"{key}.gt.{_quote(last_row[key])}"
+
+        if equals:
+            conditions.append(f"and({','.join(equals + [greater])})")
+        else:
+            conditions.append(greater)
+
+    return ",".join(conditions)
+
+
+# endregion
+
+
+# region ------------ Filters ------------
+# (column, PostgREST operator, value), e.g. ("rank", "lte", 5) for rank <= 5
+Filter = tuple[str, str, Any]
+
+
+def _apply_filters(query, filters: list[Filter] | None):
+    """
+    Adds the filters to a query, so they are applied by Postgres and only the matching
+    rows are sent.
+    """
+    for column, operator, value in filters or []:
+        query = query.filter(column, operator, value)
+    return query
+
+
+# endregion
+
+
+# region ------------ Read table ------------
+def read_table(
+    client: Client,
+    table_name: str,
+    key: str | list[str],
+    columns: list[str] | None = None,
+    schema_name: str = "public",
+    page_size: int = 1000,
+    schema: dict[str, pl.DataType] | None = None,
+    filters: list[Filter] | None = None,
+) -> pl.DataFrame:
+    """
+    Reads a whole table with keyset pagination (where key > last key order by key
+    limit n). Unlike offset pagination, every page costs the same on large tables and
+    rows are not skipped or duplicated if the table changes during the read.
+
+    The key must be unique and not null, a list of columns is used as a composite key.
+
+    Args:
+        client (Client): The supabase client.
+        table_name (str): The name of the table to read.
+        key (str | list[str]): The primary key column(s) to paginate on.
+        columns (list[str], optional): Columns to select, the key is always
+            selected. Defaults to all the columns.
+        schema_name (str, optional): The database schema. Defaults to "public".
+        page_size (int, optional): Rows per request. Defaults to 1000.
+        schema (dict, optional): Polars schema of the result. Defaults to inferring it
+            from all the rows.
+        filters (list[Filter], optional): Filters applied on the database, e.g.
+            [("rank", "lte", 5)]. Defaults to no filter.
+
+    Returns:
+        pl.DataFrame: The table data
+    """
+    keys: list[str] = [key] if isinstance(key, str) else list(key)
+    select_columns: str = (
+        ",".join(dict.fromkeys(keys + list(columns))) if columns else "*"
+    )
+
+    # schema() builds a new PostgREST client, create it once for all the pages
+    database = client.schema(schema_name)
+
+    all_results: list[dict] = []
+    last_row: dict | None = None
+
+    while True:
+        query = _apply_filters(
+            database.table(table_name).select(select_columns), filters
+        )
+
+        if last_row is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], last_row[keys[0]])
+            else:
+                query = query.or_(_keyset_filter(keys, last_row))
+
+        for key_column in keys:
+            query = query.order(key_column)
+
+        data: list[dict] = query.limit(page_size).execute().data
+
+        if not data:
+            break
+
+        all_results.extend(data)
+
+        if len(data) < page_size:
+            break
+
+        last_row = data[-1]
+
+    return _to_dataframe(all_results, schema)
+
+
+def _to_dataframe(
+    rows: list[dict], schema: dict[str, pl.DataType] | None
+) -> pl.DataFrame:
+    """
+    Builds the DataFrame of the rows read, with the schema if there is one.
+    """
+    if schema is not None:
+        return pl.DataFrame(data=rows, schema=schema, strict=False)
+
+    return pl.DataFrame(data=rows, infer_schema_length=None, strict=False)
+
+
+# endregion
+
+
+# region ------------ Read max value ------------
+def read_max_value(
+    client: Client,
+    table_name: str,
+    column: str,
+    schema_name: str = "public",
+    filters: list[Filter] | None = None,
+) -> Any | None:
+    """
+    Reads the max value of a column, ignoring nulls. The max is computed by Postgres
+    (order by the column desc limit 1), so only one row is sent whatever the size of
+    the table.
+
+    Args:
+        client (Client): The supabase client.
+        table_name (str): The name of the table to query.
+        column (str): The column to get the max value from.
+        schema_name (str, optional): The database schema. Defaults to "public".
+        filters (list[Filter], optional): Filters applied on the database. Defaults
+            to no filter.
+
+    Returns:
+        Any | None: The max value as returned by the database, or None if there are
+            no rows
+    """
+    data: list[dict] = (
+        _apply_filters(
+            client.schema(schema_name).table(table_name).select(column), filters
+        )
+        .not_.is_(column, "null")
+        .order(column, desc=True)
+        .limit(1)
+        .execute()
+        .data
+    )
+
+    if not data:
+        return None
+
+    return data[0][column]
+
+
+# endregion
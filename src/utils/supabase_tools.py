@@ -4,11 +4,22 @@ File to handle functions that interact with the supabase database and tables
 
 import polars as pl
 import os
-
+import json
+import hashlib
+import base64
+import math
+import time
+import httpx
+
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from postgrest.exceptions import APIError
 from pathlib import Path
-from supabase import create_client, Client
+from supabase import Client
 from dotenv import load_dotenv
-from src.utils.supabase_client import supabase
+from src.utils.supabase_client import get_supabase
+from src.utils.supabase_readers import read_max_value, read_table
+from src.utils.postgres_loader import copy_table
 from src.utils.logger import setup_logger
 
 # region ------------ Load env variables ------------
@@ -17,6 +28,25 @@ load_dotenv()
 SUPABASE_URL: str = os.getenv("SUPABASE_URL")
 SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
 
+# Upsert batching: max rows and estimated bytes per request, and concurrent requests
+UPSERT_CHUNK_ROWS: int = int(os.getenv("SUPABASE_UPSERT_CHUNK_ROWS", 500))
+UPSERT_CHUNK_BYTES: int = int(os.getenv("SUPABASE_UPSERT_CHUNK_BYTES", 2_000_000))
+UPSERT_WORKERS: int = int(os.getenv("SUPABASE_UPSERT_WORKERS", 4))
+
+# Files over this size are uploaded with the resumable upload, in chunks of 6 MB (the
+# chunk size expected by supabase storage)
+RESUMABLE_MIN_BYTES: int = int(os.getenv("SUPABASE_RESUMABLE_MIN_BYTES", 6 * 1024**2))
+RESUMABLE_CHUNK_BYTES: int = 6 * 1024**2
+
+# How update_table writes: "rest" (PostgREST upserts) or "copy" (Postgres COPY)
+LOAD_METHOD: str = os.getenv("SUPABASE_LOAD_METHOD", "rest")
+
+# Column with the hash of the business columns, stored in the tables as the hash index
+ROW_HASH_COLUMN: str = "row_hash"
+# Load metadata, changes on every run and is not part of the hash
+ROW_HASH_EXCLUDE: tuple[str, ...] = ("updated_at",)
+# Keys per request when reading the stored hashes of a batch, keeps the url short
+HASH_KEYS_PER_REQUEST: int = 300
 # endregion
 
 
@@ -26,287 +56,513 @@ logger = setup_logger(__name__)
 
 
 # region ------------ Create connection ------------
-def init_connection():
+def init_connection() -> Client:
     """
-    Runs the create_client function of supabase that returns a connection to the
-    database
+    Returns the supabase client of the process (see get_supabase), created on the
+    first call and shared by every caller
 
     Returns:
         Client: Instance of the client that connects to the database
     """
-    url = SUPABASE_URL
-    key = SUPABASE_KEY
-    return create_client(url, key)
+    return get_supabase()
 
 
 # endregion
 
 
 # region ------------ File uploads ------------
-# Upload file to supabase bucket
-def upload_file(local_path: Path, filename: Path, bucket: str, folder: str):
+def _tus_metadata(**values: str) -> str:
     """
-    Uploads a file to a supabase bucket
-
-    ARGS:
-        local_path (Path): The local path of the file to upload
-        bucket (str, optional): The name of the bucket to upload to
-        folder (str, optional): The folder on the bucket to upload the file to
+    Encodes the Upload-Metadata header of the resumable upload protocol (TUS).
     """
-    with open(local_path, "rb") as f:
-        file_bytes = f.read()
-        supabase.storage.from_(bucket).upload(f"{folder}/{filename.name}", file_bytes)
-        logger.info(
-            "Uploaded file to supabase bucket: FILE: %s / BUCKET: %s",
-            local_path,
-            bucket,
-        )
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+        for key, value in values.items()
+    )
 
 
-# endregion
+def _upload_file_resumable(
+    local_path: Path, object_name: str, bucket: str, max_retries: int = 3
+):
+    """
+    Uploads a file with the resumable upload endpoint of supabase storage (TUS). The
+    file is sent from disk in chunks of RESUMABLE_CHUNK_BYTES, and a failed chunk is
+    resumed from the offset stored by the server instead of starting over.
+    """
+    file_size: int = os.path.getsize(local_path)
+    headers: dict = {
+        "authorization": f"Bearer {SUPABASE_KEY}",
+        "apikey": SUPABASE_KEY,
+        "tus-resumable": "1.0.0",
+    }
+
+    with httpx.Client(timeout=60) as client:
+        response = client.post(
+            f"{SUPABASE_URL}/storage/v1/upload/resumable",
+            headers={
+                **headers,
+                "upload-length": str(file_size),
+                "upload-metadata": _tus_metadata(
+                    bucketName=bucket,
+                    objectName=object_name,
+                    contentType="application/octet-stream",
+                ),
+            },
+        )
+        response.raise_for_status()
+        upload_url: str = response.headers["location"]
+
+        offset: int = 0
+        failures: int = 0
+        with open(local_path, "rb") as f:
+            while offset < file_size:
+                f.seek(offset)
+                chunk: bytes = f.read(RESUMABLE_CHUNK_BYTES)
+
+                try:
+                    response = client.patch(
+                        upload_url,
+                        headers={
+                            **headers,
+                            "upload-offset": str(offset),
+                            "content-type": "application/offset+octet-stream",
+                        },
+                        content=chunk,
+                    )
+                    response.raise_for_status()
+                    offset = int(response.headers["upload-offset"])
+                    failures = 0
+
+                except httpx.HTTPError as e:
+                    failures += 1
+                    logger.warning(
+                        "Attempt %s/%s failed uploading %s at offset %s: %s",
+                        failures,
+                        max_retries,
+                        object_name,
+                        offset,
+                        e,
+                    )
+                    if failures == max_retries:
+                        raise
+
+                    time.sleep(2**failures)
+
+                    # Resume from what the server actually stored
+                    response = client.head(upload_url, headers=headers)
+                    response.raise_for_status()
+                    offset = int(response.headers["upload-offset"])
 
 
-# region ------------ Update table ------------
-# Update a table in the supabase database
-def update_table(
-    table_name: str, data_to_update: pl.DataFrame, on_conflict: str = "game_id"
-):
+# Upload file to supabase bucket
+def upload_file(local_path: Path, filename: Path, bucket: str, folder: str):
     """
-    Update a table in the supabase database
+    Uploads a file to a supabase bucket. The file is streamed from disk, it is never
+    read into memory as a whole: files up to RESUMABLE_MIN_BYTES go in a single
+    request, bigger files use the resumable upload in chunks.
 
     ARGS:
-        table_name (str): The name of the table to update
-        data_to_update (pl.DataFrame): The data to update the table with
+        local_path (Path): The local path of the file to upload
+        bucket (str, optional): The name of the bucket to upload to
+        folder (str, optional): The folder on the bucket to upload the file to
     """
-    # Convert dates to strings with polars to be JSON serialized by supabase
-    data_to_update = data_to_update.with_columns(
-        [
-            data_to_update[col].cast(pl.String)
-            for col, dtype in data_to_update.schema.items()
-            if dtype in (pl.Date, pl.Datetime)
-        ]
+    object_name: str = f"{folder}/{filename.name}"
+
+    if os.path.getsize(local_path) > RESUMABLE_MIN_BYTES:
+        _upload_file_resumable(local_path, object_name, bucket)
+    else:
+        with open(local_path, "rb") as f:
+            get_supabase().storage.from_(bucket).upload(object_name, f)
+
+    logger.info(
+        "Uploaded file to supabase bucket: FILE: %s / BUCKET: %s",
+        local_path,
+        bucket,
     )
 
-    rows: list[dict] = data_to_update.to_dicts()
 
-    response = (
-        supabase.table(table_name).upsert(rows, on_conflict=on_conflict).execute()
-    )
-    logger.info("Updated table: %s", table_name)
-    logger.info("Number of rows updated: %s", len(rows))
+# endregion
 
 
-# endregion
+# region ------------ Row hashing ------------
+def _row_digest(row: tuple) -> str:
+    # Canonical JSON of the values in column order, dates and datetimes as ISO strings
+    text: str = json.dumps(row, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-# region ------------ Query all games ------------
-# Query all data from rawg_games
-def query_all_data_rawg_games() -> list[dict]:
+def add_row_hash(
+    data: pl.DataFrame, exclude: tuple[str, ...] = ROW_HASH_EXCLUDE
+) -> pl.DataFrame:
     """
-    Function to paginate all the data available on the table "rawg_games"
+    Adds the row_hash column, the sha256 of a canonical JSON serialization of all the
+    business columns of the row (every column except the load metadata in `exclude`).
+
+    The hash only depends on the values, so it stays the same across Polars versions.
+
+    ARGS:
+        data (pl.DataFrame): The cleaned data
+        exclude (tuple[str, ...], optional): Columns left out of the hash
 
     Returns:
-        list[dict]: List of dictionaries with all the data
+        pl.DataFrame: The data with the row_hash column as string
     """
-    all_results: list[dict] = []
-    batch_size: int = 1000
-    start = 0
-
-    while True:
-        response = (
-            supabase.table("rawg_games")
-            .select("game_id")
-            .range(start=start, end=start + batch_size - 1)
-            .execute()
+    hash_columns: list[str] = [
+        col for col in data.columns if col not in exclude and col != ROW_HASH_COLUMN
+    ]
+
+    return data.with_columns(
+        pl.Series(
+            ROW_HASH_COLUMN,
+            [_row_digest(row) for row in data.select(hash_columns).iter_rows()],
+            dtype=pl.String,
         )
+    )
 
-        data: list[dict] = response.data
-        if not data:
-            break
-        all_results.extend(data)
-        start += batch_size
 
-    return all_results
+def filter_changed_rows(
+    table_name: str,
+    data: pl.DataFrame,
+    on_conflict: str,
+    keys_per_request: int = HASH_KEYS_PER_REQUEST,
+    max_workers: int = UPSERT_WORKERS,
+) -> pl.DataFrame:
+    """
+    Keeps only the rows that are new or changed compared to the table, using the
+    row_hash column stored in the table as the hash index.
 
+    Only the stored hashes of the keys in the data are read (key in (...) filters,
+    `keys_per_request` keys at a time), so the cost grows with the batch and not with
+    the table.
 
-# Query all data from rawg_games
-def query_all_data_rawg_tags() -> list[dict]:
-    """
-    Function to paginate all the data available on the table "rawg_tags"
+    ARGS:
+        table_name (str): The name of the table to compare with
+        data (pl.DataFrame): The data with the row_hash column
+        on_conflict (str): The unique column(s) of the table, the first one is used
+            in the filter
+        keys_per_request (int, optional): Keys in the filter of each request
+        max_workers (int, optional): Max concurrent requests
 
     Returns:
-        list[dict]: List of dictionaries with all the data
+        pl.DataFrame: The inserted or changed rows
     """
-    all_results: list[dict] = []
-    batch_size: int = 1000
-    start = 0
+    keys: list[str] = [key.strip() for key in on_conflict.split(",")]
+    schema: dict[str, pl.DataType] = {
+        **{key: data.schema[key] for key in keys},
+        ROW_HASH_COLUMN: pl.String,
+    }
+    key_values: list = data.get_column(keys[0]).unique().drop_nulls().to_list()
+
+    def read_hashes(values: list) -> pl.DataFrame:
+        return read_table(
+            client=get_supabase(),
+            table_name=table_name,
+            key=keys,
+            columns=keys + [ROW_HASH_COLUMN],
+            schema=schema,
+            filters=[(keys[0], "in", f"({','.join(map(str, values))})")],
+        )
 
-    while True:
-        response = (
-            supabase.table("rawg_tags")
-            .select("tag_id")
-            .range(start=start, end=start + batch_size - 1)
-            .execute()
+    batches: list[list] = [
+        key_values[start : start + keys_per_request]
+        for start in range(0, len(key_values), keys_per_request)
+    ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        df_existing: pl.DataFrame = pl.concat(
+            [pl.DataFrame(schema=schema), *executor.map(read_hashes, batches)]
         )
 
-        data: list[dict] = response.data
-        if not data:
-            break
-        all_results.extend(data)
-        start += batch_size
+    df_changed: pl.DataFrame = data.join(
+        df_existing, on=keys + [ROW_HASH_COLUMN], how="anti"
+    )
 
-    return all_results
+    logger.info(
+        "Rows unchanged since the last load (skipped): %s / inserted or changed: %s",
+        data.height - df_changed.height,
+        df_changed.height,
+    )
+
+    return df_changed
 
 
 # endregion
 
 
-# region ------------ Query existing game details ------------
-# Search for game ids  already have the game details in the table
-def query_existing_game_details_ids() -> list[int]:
+# region ------------ Update table ------------
+def _iter_chunks(
+    data: pl.DataFrame, chunk_rows: int, chunk_bytes: int | None
+) -> Iterator[pl.DataFrame]:
+    """
+    Splits a DataFrame into zero-copy slices of at most `chunk_rows` rows, and
+    splits a slice again when its estimated size is over `chunk_bytes` (e.g. rows
+    with long text like description_raw).
     """
-    Function to query all the game ids that already have the game details in the
-    table "rawg_game_details"
+    for chunk in data.iter_slices(n_rows=chunk_rows):
+        chunk_size: int = chunk.estimated_size()
+
+        if chunk_bytes and chunk_size > chunk_bytes and chunk.height > 1:
+            parts: int = math.ceil(chunk_size / chunk_bytes)
+            yield from chunk.iter_slices(n_rows=math.ceil(chunk.height / parts))
+        else:
+            yield chunk
+
+
+def _upsert_chunk(
+    table_name: str,
+    chunk: pl.DataFrame,
+    on_conflict: str,
+    chunk_number: int,
+    max_retries: int = 3,
+) -> int:
+    """
+    Upserts one chunk with retries and exponential backoff. The rows are converted
+    to dicts only here, so only the chunks in flight are held as dicts.
 
     Returns:
-        list[int]: List of game ids
+        int: Number of rows upserted
     """
-    all_existing_ids: list[int] = []
-    limit: int = 1000
-    offset: int = 0
-
-    while True:
-        response = (
-            supabase.table("rawg_game_details")
-            .select("game_id")
-            .range(start=offset, end=offset + limit - 1)
-            .execute()
-        )
+    rows: list[dict] = chunk.to_dicts()
+
+    for attempt in range(max_retries):
+        start_time = time.time()
+        try:
+            get_supabase().table(table_name).upsert(
+                rows, on_conflict=on_conflict
+            ).execute()
+
+            logger.info(
+                "Chunk %s: upserted %s rows into %s in %.2f seconds",
+                chunk_number,
+                len(rows),
+                table_name,
+                time.time() - start_time,
+            )
+            return len(rows)
+
+        except (APIError, httpx.HTTPError) as e:
+            logger.warning(
+                "Attempt %s/%s failed for chunk %s of %s: %s",
+                attempt + 1,
+                max_retries,
+                chunk_number,
+                table_name,
+                e,
+            )
+            if attempt == max_retries - 1:
+                raise
+
+            time.sleep(2 ** (attempt + 1))
 
-        data: list[dict] = response.data
 
-        if not data:
-            break
+# Update a table in the supabase database
+def update_table(
+    table_name: str,
+    data_to_update: pl.DataFrame,
+    on_conflict: str = "game_id",
+    chunk_rows: int = UPSERT_CHUNK_ROWS,
+    chunk_bytes: int | None = UPSERT_CHUNK_BYTES,
+    max_workers: int = UPSERT_WORKERS,
+    skip_unchanged: bool = False,
+    method: str = LOAD_METHOD,
+):
+    """
+    Update a table in the supabase database. The data is sent in chunks (by row
+    count and by size) over a small thread pool, and each chunk is retried on its
+    own.
 
-        batch_ids: list[int] = [int(item["game_id"]) for item in data]
-        all_existing_ids.extend(batch_ids)
+    With `skip_unchanged`, a row_hash column is added and only the rows whose hash
+    differs from the one stored in the table are sent (the table needs the row_hash
+    column).
 
-        if len(data) < limit:
-            break
+    With method "copy", the data is loaded with copy_table instead (COPY into a
+    staging table and a single merge), much faster for full reloads. The unchanged
+    rows are then skipped by the merge on the database.
 
-        offset += limit
+    ARGS:
+        table_name (str): The name of the table to update
+        data_to_update (pl.DataFrame): The data to update the table with
+        on_conflict (str, optional): The unique column(s) of the upsert
+        chunk_rows (int, optional): Max rows per request
+        chunk_bytes (int, optional): Max estimated bytes per request, None to split
+            by rows only
+        max_workers (int, optional): Max concurrent requests
+        skip_unchanged (bool, optional): Send only inserted or changed rows
+        method (str, optional): "rest" or "copy". Defaults to SUPABASE_LOAD_METHOD.
+    """
+    start_time = time.time()
+
+    if method == "copy":
+        copy_table(
+            table_name=table_name,
+            data_to_update=(
+                add_row_hash(data_to_update) if skip_unchanged else data_to_update
+            ),
+            on_conflict=on_conflict,
+            skip_unchanged_column=ROW_HASH_COLUMN if skip_unchanged else None,
+        )
+        return
 
-    return all_existing_ids
+    if skip_unchanged:
+        data_to_update = filter_changed_rows(
+            table_name, add_row_hash(data_to_update), on_conflict
+        )
 
+    # Convert dates to strings with polars to be JSON serialized by supabase
+    data_to_update = data_to_update.with_columns(
+        [
+            data_to_update[col].cast(pl.String)
+            for col, dtype in data_to_update.schema.items()
+            if dtype in (pl.Date, pl.Datetime)
+        ]
+    )
 
-# Search for tag ids  already have the tag details in the table
-def query_existing_tag_details_ids() -> list[int]:
-    """
-    Function to query all the tag ids that already have the tag details in the
-    table "rawg_tag_details"
+    rows_updated: int = 0
+    failed_chunks: list[int] = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures: dict = {
+            executor.submit(
+                _upsert_chunk, table_name, chunk, on_conflict, chunk_number
+            ): chunk_number
+            for chunk_number, chunk in enumerate(
+                _iter_chunks(data_to_update, chunk_rows, chunk_bytes), start=1
+            )
+        }
+
+        for future in as_completed(futures):
+            try:
+                rows_updated += future.result()
+            except (APIError, httpx.HTTPError):
+                failed_chunks.append(futures[future])
 
-    Returns:
-        list[int]: List of tag ids
-    """
-    all_existing_ids: list[int] = []
-    limit: int = 1000
-    offset: int = 0
+    logger.info("Updated table: %s", table_name)
+    logger.info(
+        "Number of rows updated: %s in %s chunks (%.2f seconds)",
+        rows_updated,
+        len(futures),
+        time.time() - start_time,
+    )
 
-    while True:
-        response = (
-            supabase.table("rawg_tag_details")
-            .select("tag_id")
-            .range(start=offset, end=offset + limit - 1)
-            .execute()
+    if failed_chunks:
+        logger.error(
+            "----- FAILED CHUNKS FOR %s: %s -----", table_name, sorted(failed_chunks)
+        )
+        raise RuntimeError(
+            f"{len(failed_chunks)} of {len(futures)} chunks failed for {table_name}"
         )
 
-        data: list[dict] = response.data
 
-        if not data:
-            break
+# endregion
 
-        batch_ids: list[int] = [int(item["tag_id"]) for item in data]
-        all_existing_ids.extend(batch_ids)
 
-        if len(data) < limit:
-            break
+# region ------------ Query high-water mark ------------
+# Query the max value of a column, used as high-water mark for incremental fetches
+def query_max_value(table_name: str, column: str) -> str | None:
+    """
+    Function to query the max value of a column of a table, ignoring nulls
 
-        offset += limit
+    ARGS:
+        table_name (str): The name of the table to query
+        column (str): The column to get the max value from
 
-    return all_existing_ids
+    Returns:
+        str | None: The max value as returned by the database, or None if the table
+            is empty
+    """
+    return read_max_value(client=get_supabase(), table_name=table_name, column=column)
 
 
 # endregion
 
 
-# region ------------ Query all tags ------------
-# Query all data from rawg_games
-def query_all_data_rawg_tags() -> list[dict]:
+# region ------------ Query details delta ------------
+# Compute the game ids that need their details fetched, once per run
+def refresh_game_details_delta() -> int:
     """
-    Function to paginate all the data available on the table "rawg_tags"
+    Function to refresh "rawg_game_details_queue" with the game ids missing from
+    "rawg_game_details" or with details older than "rawg_games.updated_on_rawg". The
+    join runs once on the database, iter_game_details_delta then pages the queue.
 
     Returns:
-        list[dict]: List of dictionaries with all the data
+        int: Number of games in the queue
+    """
+    return int(get_supabase().rpc("refresh_rawg_game_details_queue").execute().data)
+
+
+# Stream the game ids that need their details fetched, computed on the database
+def iter_game_details_delta(page_size: int = 1000) -> Iterator[int]:
     """
-    all_results: list[dict] = []
-    batch_size: int = 1000
-    start = 0
+    Function to stream the game ids of "rawg_game_details_queue" (see
+    refresh_game_details_delta), using the "rawg_game_details_delta" function of the
+    database. Missing games come first, then the most added games.
+
+    Pages are requested with keyset pagination only when the previous page is
+    consumed, so stopping early (e.g. at the request budget) stops the queries too.
+
+    ARGS:
+        page_size (int, optional): Ids per request. Defaults to 1000.
+
+    Yields:
+        int: The game ids, in priority order
+    """
+    keyset: dict = {}
 
     while True:
-        response = (
-            supabase.table("rawg_tags")
-            .select("tag_id")
-            .range(start=start, end=start + batch_size - 1)
-            .execute()
-        )
+        response = get_supabase().rpc(
+            "rawg_game_details_delta", {**keyset, "page_size": page_size}
+        ).execute()
 
         data: list[dict] = response.data
+
         if not data:
             break
-        all_results.extend(data)
-        start += batch_size
 
-    return all_results
+        for item in data:
+            yield int(item["game_id"])
 
+        if len(data) < page_size:
+            break
 
-# endregion
+        last_row: dict = data[-1]
+        keyset = {
+            "after_sort_group": last_row["sort_group"],
+            "after_priority": last_row["priority"],
+            "after_game_id": last_row["game_id"],
+        }
 
 
-# region ------------ Query existing tag details ------------
-def query_existing_tags_ids() -> list[int]:
+# Stream the tag ids that need their details fetched, computed on the database
+def iter_tag_details_delta(page_size: int = 1000) -> Iterator[int]:
     """
-    Function to query all the tag ids that already have the tag details in the
-    table "rawg_tag_details"
+    Function to stream the tag ids missing from "rawg_tag_details", using the
+    "rawg_tag_details_delta" function of the database.
 
-    Returns:
-        list[int]: List of game ids
+    ARGS:
+        page_size (int, optional): Ids per request. Defaults to 1000.
+
+    Yields:
+        int: The tag ids, in order
     """
-    all_existing_ids: list[int] = []
-    limit: int = 1000
-    offset: int = 0
+    keyset: dict = {}
 
     while True:
-        response = (
-            supabase.table("rawg_tag_details")
-            .select("tag_id")
-            .range(start=offset, end=offset + limit - 1)
-            .execute()
-        )
+        response = get_supabase().rpc(
+            "rawg_tag_details_delta", {**keyset, "page_size": page_size}
+        ).execute()
 
         data: list[dict] = response.data
 
         if not data:
             break
 
-        batch_ids: list[int] = [int(item["tag_id"]) for item in data]
-        all_existing_ids.extend(batch_ids)
+        for item in data:
+            yield int(item["tag_id"])
 
-        if len(data) < limit:
+        if len(data) < page_size:
             break
 
-        offset += limit
-
-    return all_existing_ids
+        keyset = {"after_tag_id": data[-1]["tag_id"]}
 
 
 # endregion
@@ -0,0 +1,83 @@
+-- Delta functions for the details fetchers.
+-- They return only the ids that need a request, in keyset pages, so the fetchers no
+-- longer download every id of rawg_games / rawg_tags to diff them on the client.
+
+
+-- Games missing from rawg_game_details, or updated on RAWG after their details were
+-- fetched. Missing games come first, then the most added games (priority).
+-- Keyset: pass the sort_group, priority and game_id of the last row of a page to get
+-- the next one.
+create or replace function public.rawg_game_details_delta(
+    after_sort_group integer default null,
+    after_priority bigint default null,
+    after_game_id bigint default null,
+    page_size integer default 1000
+)
+returns table (game_id bigint, sort_group integer, priority bigint)
+language sql
+stable
+as $$
+    with delta as (
+        select
+            g.game_id,
+            case when d.game_id is null then 0 else 1 end as sort_group,
+            coalesce(g.added_in_catalog_count, 0)::bigint as priority
+
+        from public.rawg_games as g
+
+        left join public.rawg_game_details as d
+            on d.game_id = g.game_id
+
+        where
+            d.game_id is null
+            or d.updated_on_rawg is null
+            or g.updated_on_rawg::timestamp > d.updated_on_rawg::timestamp
+    )
+
+    select
+        delta.game_id,
+        delta.sort_group,
+        delta.priority
+
+    from delta
+
+    where
+        after_game_id is null
+        or (delta.sort_group, -delta.priority, delta.game_id)
+            > (after_sort_group, -after_priority, after_game_id)
+
+    order by
+        delta.sort_group asc,
+        delta.priority desc,
+        delta.game_id asc
+
+    limit page_size
+$$;
+
+
+-- Tags missing from rawg_tag_details.
+-- Keyset: pass the tag_id of the last row of a page to get the next one.
+create or replace function public.rawg_tag_details_delta(
+    after_tag_id bigint default null,
+    page_size integer default 1000
+)
+returns table (tag_id bigint)
+language sql
+stable
+as $$
+    select t.tag_id
+
+    from public.rawg_tags as t
+
+    where
+        not exists (
+            select 1
+            from public.rawg_tag_details as d
+            where d.tag_id = t.tag_id
+        )
+        and (after_tag_id is null or t.tag_id > after_tag_id)
+
+    order by t.tag_id asc
+
+    limit page_size
+$$;
@@ -0,0 +1,10 @@
+-- Hash index of the raw tables.
+-- row_hash is the hash of the business columns computed by the cleaners, they read it
+-- back to send only inserted or changed rows on the next load.
+
+alter table public.rawg_games add column if not exists row_hash text;
+alter table public.rawg_game_details add column if not exists row_hash text;
+alter table public.rawg_tags add column if not exists row_hash text;
+alter table public.rawg_tag_details add column if not exists row_hash text;
+alter table public.rawg_platforms add column if not exists row_hash text;
+alter table public.rawg_parent_platform add column if not exists row_hash text;
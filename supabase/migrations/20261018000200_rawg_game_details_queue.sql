@@ -0,0 +1,102 @@
+-- Queue of the game details delta, materialized once per run.
+-- rawg_game_details_delta used to compute the rawg_games / rawg_game_details join on
+-- every keyset page, and its row comparison on -priority could not use an index, so a
+-- large delta cost one full join per page. The fetcher now refreshes this table once
+-- and pages it on the index of the ordering.
+--
+-- The queue belongs to one pipeline run at a time: the workflow runs in a single
+-- concurrency group, and the refreshes take an advisory lock so two of them never
+-- interleave. RLS is enabled without policies, the table is only reached through the
+-- security definer functions below.
+
+
+create table if not exists public.rawg_game_details_queue (
+    game_id bigint primary key,
+    sort_group integer not null,
+    -- negated priority, so the keyset order is ascending on every column
+    neg_priority bigint not null
+);
+
+create index if not exists rawg_game_details_queue_order_idx
+    on public.rawg_game_details_queue (sort_group, neg_priority, game_id);
+
+alter table public.rawg_game_details_queue enable row level security;
+
+
+-- Recomputes the queue: games missing from rawg_game_details, or updated on RAWG after
+-- their details were fetched. Returns the number of games in the queue.
+create or replace function public.refresh_rawg_game_details_queue()
+returns bigint
+language plpgsql
+volatile
+security definer
+set search_path = public
+as $$
+declare
+    queued bigint;
+begin
+    -- one refresh at a time, released at the end of the transaction
+    perform pg_advisory_xact_lock(hashtext('rawg_game_details_queue'));
+
+    -- truncate, pg_safeupdate rejects a delete without a where clause over PostgREST
+    truncate table public.rawg_game_details_queue;
+
+    insert into public.rawg_game_details_queue (game_id, sort_group, neg_priority)
+    select
+        g.game_id,
+        case when d.game_id is null then 0 else 1 end as sort_group,
+        -coalesce(g.added_in_catalog_count, 0)::bigint as neg_priority
+
+    from public.rawg_games as g
+
+    left join public.rawg_game_details as d
+        on d.game_id = g.game_id
+
+    where
+        d.game_id is null
+        or d.updated_on_rawg is null
+        or g.updated_on_rawg::timestamp > d.updated_on_rawg::timestamp;
+
+    get diagnostics queued = row_count;
+
+    analyze public.rawg_game_details_queue;
+
+    return queued;
+end;
+$$;
+
+
+-- Pages the queue. Missing games come first, then the most added games (priority).
+-- Keyset: pass the sort_group, priority and game_id of the last row of a page to get
+-- the next one, each page is a range scan of rawg_game_details_queue_order_idx.
+create or replace function public.rawg_game_details_delta(
+    after_sort_group integer default null,
+    after_priority bigint default null,
+    after_game_id bigint default null,
+    page_size integer default 1000
+)
+returns table (game_id bigint, sort_group integer, priority bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select
+        q.game_id,
+        q.sort_group,
+        -q.neg_priority as priority
+
+    from public.rawg_game_details_queue as q
+
+    where
+        after_game_id is null
+        or (q.sort_group, q.neg_priority, q.game_id)
+            > (after_sort_group, -after_priority, after_game_id)
+
+    order by
+        q.sort_group asc,
+        q.neg_priority asc,
+        q.game_id asc
+
+    limit page_size
+$$;